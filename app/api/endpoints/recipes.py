@@ -1,13 +1,40 @@
 from fastapi import APIRouter, Depends, HTTPException, Query, Body
 from sqlalchemy.orm import Session
-from typing import Dict, List, Any, Union
+from typing import Dict, List, Any, Optional, Tuple, Union
 
 from app.core.database import get_db
+from app.core.dependencies import get_async_qdrant_service
+from app.services.async_qdrant_service import AsyncQdrantService
 from app.services import recipe_service, preference_service
-from app.schemas.recipe_schema import Recipe, RecipeCard, SaveRecipeRequest
+from app.schemas.recipe_schema import Recipe, RecipeCard, SaveRecipeRequest, BatchRecommendationRequest, BatchRecommendationResponse, RecipeBatchRequest, RecipeBatchResponse
 
 router = APIRouter()  # tags router'da değil, include_router'da belirtilecek
 
+def recommendation_ranges(
+    min_total_time: Optional[float] = Query(None, ge=0, description="Minimum total time (minutes)"),
+    max_total_time: Optional[float] = Query(None, ge=0, description="Maximum total time (minutes)"),
+    min_calories: Optional[float] = Query(None, ge=0, description="Minimum calories (kcal)"),
+    max_calories: Optional[float] = Query(None, ge=0, description="Maximum calories (kcal)"),
+    min_fat: Optional[float] = Query(None, ge=0, description="Minimum fat (g)"),
+    max_fat: Optional[float] = Query(None, ge=0, description="Maximum fat (g)"),
+    min_protein: Optional[float] = Query(None, ge=0, description="Minimum protein (g)"),
+    max_protein: Optional[float] = Query(None, ge=0, description="Maximum protein (g)"),
+    min_carb: Optional[float] = Query(None, ge=0, description="Minimum carbohydrates (g)"),
+    max_carb: Optional[float] = Query(None, ge=0, description="Maximum carbohydrates (g)"),
+) -> Dict[str, Tuple[Optional[float], Optional[float]]]:
+    """Nutrition / cook-time query parameters as {field: (min, max)}, only the bounded fields."""
+    bounds = {
+        "total_time": (min_total_time, max_total_time),
+        "calories": (min_calories, max_calories),
+        "fat": (min_fat, max_fat),
+        "protein": (min_protein, max_protein),
+        "carb": (min_carb, max_carb),
+    }
+    for field, (low, high) in bounds.items():
+        if low is not None and high is not None and low > high:
+            raise HTTPException(status_code=400, detail=f"min_{field} must not be greater than max_{field}")
+    return {field: bound for field, bound in bounds.items() if bound != (None, None)}
+
 @router.get("/getCategories",
     response_model=List[str],
     summary="Get Recipe Categories",
@@ -39,13 +66,15 @@ async def get_categories(db: Session = Depends(get_db)):
     
     Parameters:
     - **user_id**: The ID of the user for whom recommendations are requested.
+    - **min_/max_total_time, min_/max_calories, min_/max_fat, min_/max_protein, min_/max_carb**:
+      Optional inclusive bounds, applied inside the vector search.
     
     Returns:
     - A list of recommended recipes, ordered by relevance.
     
     Example:
     ```
-    GET /api/v1/getUserRecommendations?user_id=user123
+    GET /api/v1/getUserRecommendations?user_id=user123&max_total_time=30&max_calories=500
     
     Response:
     [
@@ -64,11 +93,16 @@ async def get_categories(db: Session = Depends(get_db)):
     """)
 async def get_user_recommendations(
     user_id: str = Query(..., description="User ID for recommendations", example="user123"),
-    db: Session = Depends(get_db)
+    ranges: Dict[str, Tuple[Optional[float], Optional[float]]] = Depends(recommendation_ranges),
+    db: Session = Depends(get_db),
+    qdrant_service: AsyncQdrantService = Depends(get_async_qdrant_service)
 ):
     """Kullanıcı için kişiselleştirilmiş tarif önerileri getirir."""
     try:
-        recommendations = recipe_service.get_user_recommendations(db=db, user_id=user_id)
+        recommendations = await recipe_service.get_user_recommendations_async(
+            db=db, user_id=user_id, qdrant_service=qdrant_service,
+            filters={"ranges": ranges} if ranges else None
+        )
         return recommendations
     except ValueError as e:
         # Servis katmanından gelen bilinen hatalar (örn. kullanıcı bulunamadı)
@@ -77,6 +111,61 @@ async def get_user_recommendations(
         # Beklenmedik hatalar
         raise HTTPException(status_code=500, detail="Internal server error while generating recommendations.")
 
+@router.post("/getBatchRecommendations",
+    response_model=BatchRecommendationResponse,
+    summary="Get Recommendations for Many Users",
+    description="""
+    Retrieves personalized recipe recommendations for many users in one request
+    (e.g. for email digests and push notifications).
+    
+    Parameters:
+    - **user_ids**: IDs of the users (in request body)
+    - **limit**: Number of recipes per user (in request body, default 10, at most RECOMMENDATION_MAX_LIMIT)
+    - **ranges**: Optional inclusive bounds on total_time, calories, fat, protein and carb
+      (in request body), e.g. {"total_time": {"max": 30}, "calories": {"max": 500}}
+    
+    Returns:
+    - **results**: Recommended recipes per user, ordered by relevance.
+    - **errors**: Users whose recommendations could not be generated, with the reason.
+    
+    Example:
+    ```
+    POST /api/v1/getBatchRecommendations
+    
+    Request Body:
+    {
+        "user_ids": ["1", "2", "3"],
+        "limit": 5
+    }
+    
+    Response:
+    {
+        "results": {
+            "1": [{"recipe_id": 101, "recipe_name": "Recommended Recipe 1", ...}],
+            "2": [{"recipe_id": 205, "recipe_name": "Recommended Recipe 2", ...}]
+        },
+        "errors": {
+            "3": "No embedding found for user"
+        }
+    }
+    ```
+    """)
+def get_batch_recommendations(
+    request: BatchRecommendationRequest,
+    db: Session = Depends(get_db)
+):
+    """Birçok kullanıcı için tarif önerilerini tek istekte getirir."""
+    try:
+        ranges = {field: bounds.bounds() for field, bounds in request.ranges.items()}
+        return recipe_service.get_batch_user_recommendations(
+            db=db, user_ids=request.user_ids, limit=request.limit,
+            filters={"ranges": ranges} if ranges else None
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail="Internal server error while generating recommendations.")
+
 @router.get("/getRecipeDetails", 
     response_model=Recipe,
     summary="Get Recipe Details",
@@ -145,7 +234,11 @@ def get_recipe_details(
     - protein: Protein content
     - carb: Carbohydrate content
     - category: Recipe category
+    - label: Sorted list of recipe labels
     - ingredients: List of ingredients with quantities
+
+    Only the requested columns are read; ingredient, label and category tables
+    are queried only when those fields are requested.
     
     Examples:
     ```
@@ -197,6 +290,51 @@ def get_recipe_card(
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
 
+@router.post("/getRecipes",
+    response_model=RecipeBatchResponse,
+    summary="Get Many Recipes",
+    description="""
+    Retrieves the details or cards of many recipes in one request (e.g. a feed screen).
+    
+    Parameters:
+    - **recipe_ids**: IDs of the recipes (in request body)
+    - **fields**: Optional card fields (in request body, list or comma-separated string,
+      same fields as /getRecipeCard). Without it, full recipe details are returned.
+    
+    Returns:
+    - **results**: One entry per requested ID, in request order. Unknown IDs have
+      "found": false and "recipe": null.
+    
+    Example:
+    ```
+    POST /api/v1/getRecipes
+    
+    Request Body:
+    {
+        "recipe_ids": [12, 999999, 7],
+        "fields": "recipe_name,total_time"
+    }
+    
+    Response:
+    {
+        "results": [
+            {"recipe_id": 12, "found": true, "recipe": {"recipe_name": "Lentil Soup", "total_time": 40}},
+            {"recipe_id": 999999, "found": false, "recipe": null},
+            {"recipe_id": 7, "found": true, "recipe": {"recipe_name": "Menemen", "total_time": 15}}
+        ]
+    }
+    ```
+    """)
+def get_recipes(
+    request: RecipeBatchRequest,
+    db: Session = Depends(get_db)
+):
+    """Birçok tarifin detayını veya kartını tek istekte getirir."""
+    try:
+        return {"results": recipe_service.get_recipes_batch(db, request.recipe_ids, request.fields)}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @router.get("/getUserSavedRecipes",
     response_model=List[Recipe],
     summary="Get User's Saved Recipes",
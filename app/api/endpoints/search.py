@@ -1,94 +1,111 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from typing import List, Optional
+from fastapi.concurrency import run_in_threadpool
+import asyncio
 import logging
 
-from app.models.search import RecipeSearch
-from app.services.qdrant_service import QdrantService
-from app.core.dependencies import get_qdrant_service
+from app.models.search import RecipeSearch, RecipeSearchResponse
+from app.services.async_qdrant_service import AsyncQdrantService
+from app.core.dependencies import get_async_qdrant_service, get_search_result_cache
+from app.utils.catalog_version import get_catalog_version
+from app.utils.search_cache import SearchResultCache
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
-# Define a default value for missing sortable fields
-DEFAULT_SORT_VALUE = ""
+def _search_cache_key(search_params: RecipeSearch, catalog_version: int) -> tuple:
+    """
+    Normalized form of a search request: requests that Qdrant answers the same
+    way (letter case, surrounding whitespace of the text, order of categories /
+    labels / ranges) share an entry.
+    """
+    query = search_params.query
+    return (
+        catalog_version,
+        search_params.searchMode,
+        query.inputText.strip().lower(),
+        tuple(sorted({category.lower() for category in query.categories})),
+        tuple(sorted({label.lower() for label in query.labels})),
+        tuple(sorted((field, bounds.min, bounds.max) for field, bounds in query.ranges.items())),
+        search_params.sortByField,
+        search_params.sortByDirection,
+        search_params.limit,
+        search_params.cursor,
+        search_params.includeFacets,
+    )
 
-@router.post("/searchRecipe", response_model=List[dict]) # Endpoint path is /searchRecipe
-def search_recipe_endpoint(
+@router.post("/searchRecipe", response_model=RecipeSearchResponse) # Endpoint path is /searchRecipe
+async def search_recipe_endpoint(
     search_params: RecipeSearch,
-    qdrant_service: QdrantService = Depends(get_qdrant_service)
+    qdrant_service: AsyncQdrantService = Depends(get_async_qdrant_service),
+    search_cache: SearchResultCache = Depends(get_search_result_cache)
 ):
     """
-    Searches recipes based on keywords (inputText), filters by categories and labels,
+    Searches recipes based on keywords (inputText) - exact matches, or ranked
+    full-text matches with searchMode="fulltext" - filters by categories, labels
+    and nutrition / cook-time ranges,
     and sorts the results according to sortByField and sortByDirection.
+    Results are paged: pass the returned next_cursor back as cursor to get the
+    next page. total_time and calories are ordered across all results (by Qdrant
+    in keyword mode); in keyword mode name and category order each page.
+    With includeFacets, per-category and per-label counts of all results are added.
+    Responses are cached in-process per catalog version (see SEARCH_CACHE_*).
     Accessible via /api/v1/recipes/searchRecipe
     """
     try:
-        # Initial search using keywords from Qdrant
-        initial_results = qdrant_service.search_recipes_by_keywords(
-            input_text=search_params.query.inputText,
-            limit=50 # Fetch more results initially to allow for backend filtering
-        )
-
-        filtered_results = []
-        for recipe in initial_results:
-            # Category filtering (Case-insensitive)
-            if search_params.query.categories:
-                recipe_category = recipe.get('category', '') # Get recipe category or default to empty string
-                # Check if the recipe's category matches any of the requested categories
-                if not isinstance(recipe_category, str) or recipe_category.lower() not in [cat.lower() for cat in search_params.query.categories]:
-                    continue # Skip if category doesn't match
-
-            # Label filtering (All requested labels must be present, case-insensitive)
-            if search_params.query.labels:
-                recipe_labels = recipe.get('label') # Get recipe labels (can be list or string)
-                # Normalize recipe_labels to a list of lower-case strings
-                if isinstance(recipe_labels, str):
-                    recipe_labels_set = {recipe_labels.lower()}
-                elif isinstance(recipe_labels, list):
-                    recipe_labels_set = {str(label).lower() for label in recipe_labels}
-                else:
-                    recipe_labels_set = set() # No labels if not string or list
-
-                # Normalize query labels to a set of lower-case strings
-                query_labels_set = {label.lower() for label in search_params.query.labels}
+        # Resolve the catalog version once, so a response computed across a
+        # catalog update is stored under the old version and never served
+        cache_key = None
+        if search_cache.enabled:
+            catalog_version = await run_in_threadpool(get_catalog_version)
+            if catalog_version is not None:
+                cache_key = _search_cache_key(search_params, catalog_version)
+                cached = search_cache.get(cache_key)
+                if cached is not None:
+                    return cached
 
-                # Check if all query labels are a subset of recipe labels
-                if not query_labels_set.issubset(recipe_labels_set):
-                    continue # Skip if not all query labels are present in the recipe's labels
-
-            filtered_results.append(recipe)
-
-        # Sorting
-        sort_field = search_params.sortByField if search_params.sortByField else "name"
-        reverse_sort = search_params.sortByDirection == "descending"
-
-        # Define a robust sorting key function
-        def sort_key(item):
-            value = item.get(sort_field, DEFAULT_SORT_VALUE)
-            # Prioritize numeric types for sorting if applicable
-            if isinstance(value, (int, float)):
-                return (0, value) # Tuple prioritizes numeric types
-            elif isinstance(value, str):
-                return (1, value.lower()) # Case-insensitive sort for strings
-            else:
-                return (2, DEFAULT_SORT_VALUE) # Fallback for other types
+        # Keyword search from Qdrant; category and label filters are applied by Qdrant
+        # on the lowercased payload fields, so no post-filtering is needed
+        query = search_params.query
+        ranges = {field: bounds.bounds() for field, bounds in query.ranges.items()}
+        if search_params.searchMode == "fulltext":
+            search_page = qdrant_service.search_recipes_full_text_page
+        else:
+            search_page = qdrant_service.search_recipes_by_keywords_page
+        page = search_page(
+            input_text=query.inputText,
+            limit=search_params.limit,
+            categories=query.categories,
+            labels=query.labels,
+            cursor=search_params.cursor,
+            sort_by=search_params.sortByField,
+            descending=search_params.sortByDirection == "descending",
+            ranges=ranges
+        )
 
-        try:
-            sorted_results = sorted(
-                filtered_results,
-                key=sort_key,
-                reverse=reverse_sort
-            )
-        except Exception as e:
-            logger.error(f"Error during sorting: {e}. Field: {sort_field}")
-            # Fallback to unsorted results if sorting fails
-            sorted_results = filtered_results
+        facets = None
+        if search_params.includeFacets:
+            # Facet counts are computed by Qdrant (or the full-text index) next to the page
+            (results, next_cursor), facets = await asyncio.gather(page, qdrant_service.search_facets(
+                input_text=query.inputText,
+                mode=search_params.searchMode,
+                categories=query.categories,
+                labels=query.labels,
+                ranges=ranges
+            ))
+        else:
+            results, next_cursor = await page
 
-        # Optional: Apply a final limit to the number of results returned
-        # final_limit = 10
-        # return sorted_results[:final_limit]
-        return sorted_results
+        response = RecipeSearchResponse(results=results, next_cursor=next_cursor, facets=facets)
+        if cache_key is not None:
+            search_cache.put(cache_key, response)
+        return response
 
+    except ValueError as e:
+        # Invalid or foreign cursor, invalid range
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
     except Exception as e:
         logger.error(f"Error in recipe search endpoint: {e}")
         raise HTTPException(
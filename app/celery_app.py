@@ -1,6 +1,7 @@
 # app/celery_app.py
 from celery import Celery
 from celery.schedules import crontab
+from celery.signals import worker_process_shutdown
 import os
 
 celery_app = Celery(
@@ -23,6 +24,10 @@ celery_app.autodiscover_tasks(["app.tasks"])
 
 # Ensure our task modules are loaded
 import app.tasks.update_embeddings
+import app.tasks.precompute_recommendations
+import app.tasks.reduced_vectors
+import app.tasks.sync_recipe_payloads
+import app.tasks.recipe_documents
 
 # Celery Beat: run task every 3 mins
 celery_app.conf.beat_schedule = {
@@ -30,4 +35,42 @@ celery_app.conf.beat_schedule = {
         "task": "app.tasks.update_embeddings.update_recent_users_embeddings",
         "schedule": crontab(minute="*/3"),
     },
-}
\ No newline at end of file
+    # Full rebuild repairs any drift of the incrementally maintained embeddings
+    "rebuild-embeddings-nightly": {
+        "task": "app.tasks.update_embeddings.rebuild_user_embeddings",
+        "schedule": crontab(hour=3, minute=0),
+    },
+    # Keeps the precomputed top-K lists fresh (PRECOMPUTED_RECOMMENDATIONS_TTL_SECONDS)
+    "precompute-recommendations-hourly": {
+        "task": "app.tasks.precompute_recommendations.precompute_user_recommendations",
+        "schedule": crontab(minute=30),
+    },
+    # Category and label filters skip recipe points without the normalized payload fields
+    "sync-recipe-payloads-every-10-min": {
+        "task": "app.tasks.sync_recipe_payloads.sync_recipe_payloads",
+        "schedule": crontab(minute="*/10"),
+    },
+    # Range filters skip recipe points without the numeric payload fields
+    "sync-recipe-numeric-payloads-every-10-min": {
+        "task": "app.tasks.sync_recipe_payloads.sync_recipe_numeric_payloads",
+        "schedule": crontab(minute="5-59/10"),
+        "kwargs": {"only_missing": True},
+    },
+    # Full copy picks up edits of the numeric Recipe columns
+    "sync-recipe-numeric-payloads-nightly": {
+        "task": "app.tasks.sync_recipe_payloads.sync_recipe_numeric_payloads",
+        "schedule": crontab(hour=2, minute=30),
+    },
+    # Rebuilds the denormalized recipe_document table read by recipe_service
+    "refresh-recipe-documents-nightly": {
+        "task": "app.tasks.recipe_documents.refresh_recipe_documents",
+        "schedule": crontab(hour=4, minute=0),
+    },
+}
+
+# Each worker process lazily opens its own Qdrant client (see get_qdrant_service);
+# close it when the process exits.
+@worker_process_shutdown.connect
+def close_qdrant_client(**kwargs):
+    from app.core.dependencies import close_qdrant_service
+    close_qdrant_service()
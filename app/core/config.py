@@ -21,9 +21,67 @@ class Settings(BaseSettings):
     QDRANT_HOST: str = os.getenv("QDRANT_HOST", "localhost")
     QDRANT_PORT: int = int(os.getenv("QDRANT_PORT", "6333"))
     QDRANT_GRPC_PORT: int = int(os.getenv("QDRANT_GRPC_PORT", "6334"))
+    QDRANT_PREFER_GRPC: bool = os.getenv("QDRANT_PREFER_GRPC", os.getenv("PREFER_GRPC", "false")).lower() in ("1", "true", "yes")
+    QDRANT_TIMEOUT: int = int(os.getenv("QDRANT_TIMEOUT", 300))
+    # Connections (HTTP) or channels (gRPC) shared by all requests of a process
+    QDRANT_POOL_SIZE: int = int(os.getenv("QDRANT_POOL_SIZE", 10))
+    # Idle connections are kept open for this many seconds
+    QDRANT_KEEPALIVE_SECONDS: int = int(os.getenv("QDRANT_KEEPALIVE_SECONDS", 30))
     # Allowed collections as comma-separated list
     QDRANT_COLLECTIONS: List[str] = os.getenv("QDRANT_COLLECTIONS", "user_embeddings,text_embeddings").split(",")
     QDRANT_VECTOR_SIZE: int = int(os.getenv("QDRANT_VECTOR_SIZE", 4096))
+    # Vector storage of both collections, applied on creation and by the bootstrap migration
+    # QDRANT_QUANTIZATION: "none", "scalar" (int8, ~4x smaller) or "binary" (~32x smaller)
+    QDRANT_QUANTIZATION: str = os.getenv("QDRANT_QUANTIZATION", "none").lower()
+    QDRANT_QUANTIZATION_ALWAYS_RAM: bool = os.getenv("QDRANT_QUANTIZATION_ALWAYS_RAM", "true").lower() in ("1", "true", "yes")
+    # Keep the original float32 vectors memory-mapped on disk (used for rescoring)
+    QDRANT_VECTORS_ON_DISK: bool = os.getenv("QDRANT_VECTORS_ON_DISK", "false").lower() in ("1", "true", "yes")
+    # Default quantized search behaviour, overridable per query in search_recipes
+    QDRANT_SEARCH_RESCORE: bool = os.getenv("QDRANT_SEARCH_RESCORE", "true").lower() in ("1", "true", "yes")
+    QDRANT_SEARCH_OVERSAMPLING: float = float(os.getenv("QDRANT_SEARCH_OVERSAMPLING", 2.0))
+    # Two-stage search: a PCA-reduced named vector picks candidates, the full vector reranks them.
+    # Needs the bootstrap (named vector) and app.tasks.reduced_vectors (fit + backfill) to have run.
+    QDRANT_TWO_STAGE_SEARCH: bool = os.getenv("QDRANT_TWO_STAGE_SEARCH", "false").lower() in ("1", "true", "yes")
+    QDRANT_REDUCED_VECTOR_NAME: str = os.getenv("QDRANT_REDUCED_VECTOR_NAME", "reduced")
+    QDRANT_REDUCED_VECTOR_DIM: int = int(os.getenv("QDRANT_REDUCED_VECTOR_DIM", 128))
+    # First stage fetches limit * factor candidates; higher means better recall, more rerank work
+    QDRANT_TWO_STAGE_PREFETCH_FACTOR: int = int(os.getenv("QDRANT_TWO_STAGE_PREFETCH_FACTOR", 4))
+    # Max number of point IDs sent in a single retrieve call
+    QDRANT_RETRIEVE_BATCH_SIZE: int = int(os.getenv("QDRANT_RETRIEVE_BATCH_SIZE", 256))
+    # Create/verify payload indexes when the API starts (also: python -m app.scripts.bootstrap_qdrant)
+    QDRANT_BOOTSTRAP_ON_STARTUP: bool = os.getenv("QDRANT_BOOTSTRAP_ON_STARTUP", "true").lower() in ("1", "true", "yes")
+    # Memory budget of the in-process recipe vector cache (0 disables it)
+    RECIPE_VECTOR_CACHE_MAX_BYTES: int = int(os.getenv("RECIPE_VECTOR_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+    # In-process BM25 index of recipe payloads used by full-text search; rebuilt when older than this
+    RECIPE_TEXT_INDEX_TTL_SECONDS: int = int(os.getenv("RECIPE_TEXT_INDEX_TTL_SECONDS", 10 * 60))
+    # In-process /searchRecipe result cache, keyed by the normalized request and the catalog version (0 disables)
+    SEARCH_CACHE_MAX_ENTRIES: int = int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", 1000))
+    SEARCH_CACHE_TTL_SECONDS: int = int(os.getenv("SEARCH_CACHE_TTL_SECONDS", 5 * 60))
+    # Read-through cache of serialized recipe details, invalidated by the catalog version.
+    # Recipe edits made directly in Postgres do not bump it: they are served after at most
+    # twice the TTL (capped at 1 hour; 0 disables the cache), or after the next
+    # refresh_recipe_documents run when the document store below is enabled.
+    # In-process memory budget (0 disables that tier) and whether the shared Redis tier is used.
+    RECIPE_DETAIL_CACHE_TTL_SECONDS: int = int(os.getenv("RECIPE_DETAIL_CACHE_TTL_SECONDS", 10 * 60))
+    RECIPE_DETAIL_CACHE_MAX_BYTES: int = int(os.getenv("RECIPE_DETAIL_CACHE_MAX_BYTES", 32 * 1024 * 1024))
+    RECIPE_DETAIL_CACHE_REDIS: bool = os.getenv("RECIPE_DETAIL_CACHE_REDIS", "true").lower() in ("1", "true", "yes")
+    # Serve recipe reads from the recipe_document table (one primary-key lookup per batch).
+    # Enable after app.tasks.recipe_documents.refresh_recipe_documents has created and filled it.
+    RECIPE_DOCUMENT_STORE_ENABLED: bool = os.getenv("RECIPE_DOCUMENT_STORE_ENABLED", "false").lower() in ("1", "true", "yes")
+    # Maximum number of values per facet returned by /searchRecipe
+    SEARCH_FACET_LIMIT: int = int(os.getenv("SEARCH_FACET_LIMIT", 50))
+    # Lifetime of cached per-user recommendation lists in Redis (0 disables the cache)
+    RECOMMENDATION_CACHE_TTL_SECONDS: int = int(os.getenv("RECOMMENDATION_CACHE_TTL_SECONDS", 15 * 60))
+    # Offline top-K recommendations (app.tasks.precompute_recommendations)
+    PRECOMPUTED_RECOMMENDATIONS_TOP_K: int = int(os.getenv("PRECOMPUTED_RECOMMENDATIONS_TOP_K", 20))
+    PRECOMPUTED_RECOMMENDATIONS_TTL_SECONDS: int = int(os.getenv("PRECOMPUTED_RECOMMENDATIONS_TTL_SECONDS", 2 * 60 * 60))
+    PRECOMPUTE_BATCH_SIZE: int = int(os.getenv("PRECOMPUTE_BATCH_SIZE", 64))
+    # Upper bound on recipe IDs accepted by /getRecipes
+    RECIPE_BATCH_MAX_IDS: int = int(os.getenv("RECIPE_BATCH_MAX_IDS", 200))
+    # Upper bound on recipes per user returned by the recommendation endpoints
+    RECOMMENDATION_MAX_LIMIT: int = int(os.getenv("RECOMMENDATION_MAX_LIMIT", 50))
+    # Upper bound on user IDs accepted by /getBatchRecommendations
+    BATCH_RECOMMENDATION_MAX_USERS: int = int(os.getenv("BATCH_RECOMMENDATION_MAX_USERS", 5000))
     
     # API configuration
     API_PREFIX: str = "/api"
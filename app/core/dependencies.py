@@ -1,12 +1,90 @@
 from functools import lru_cache
+from typing import Optional
 from app.core.config import settings, Settings
 from app.services.qdrant_service import QdrantService
+from app.services.async_qdrant_service import AsyncQdrantService
+from app.utils.recipe_cache import RecipeDetailCache
+from app.utils.search_cache import SearchResultCache
+from app.utils.text_index import RecipeTextIndex
+from app.utils.vector_cache import RECIPE_VECTORS_VERSION_KEY, VectorCache
+
+_async_qdrant_service: Optional[AsyncQdrantService] = None
+
+@lru_cache()
+def get_recipe_vector_cache() -> VectorCache:
+    """
+    Recipe vector cache shared by the sync and async Qdrant services of a process.
+    """
+    return VectorCache(settings.RECIPE_VECTOR_CACHE_MAX_BYTES, version_key=RECIPE_VECTORS_VERSION_KEY)
+
+@lru_cache()
+def get_recipe_text_index() -> RecipeTextIndex:
+    """
+    Full-text recipe index shared by the sync and async Qdrant services of a process.
+    """
+    return RecipeTextIndex(settings.RECIPE_TEXT_INDEX_TTL_SECONDS)
+
+@lru_cache()
+def get_search_result_cache() -> SearchResultCache:
+    """
+    /searchRecipe response cache of the process.
+    """
+    return SearchResultCache(settings.SEARCH_CACHE_MAX_ENTRIES, settings.SEARCH_CACHE_TTL_SECONDS)
+
+@lru_cache()
+def get_recipe_detail_cache() -> RecipeDetailCache:
+    """
+    Recipe detail cache of the process, used by get_recipe_details and the list hydration.
+    """
+    return RecipeDetailCache(
+        settings.RECIPE_DETAIL_CACHE_MAX_BYTES,
+        settings.RECIPE_DETAIL_CACHE_TTL_SECONDS,
+        use_redis=settings.RECIPE_DETAIL_CACHE_REDIS,
+    )
 
 # Cache the Qdrant client instance to avoid reconnecting on every request
 @lru_cache()
 def get_qdrant_service() -> QdrantService:
     """
     Dependency function to get an instance of QdrantService.
-    Uses lru_cache to return the same instance for subsequent calls.
+    Uses lru_cache to return the same instance for subsequent calls,
+    so the API, the service layer and Celery workers share one connection pool per process.
+    """
+    return QdrantService(
+        config=settings,
+        recipe_vector_cache=get_recipe_vector_cache(),
+        recipe_text_index=get_recipe_text_index(),
+    )
+
+def close_qdrant_service() -> None:
+    """
+    Closes the shared QdrantService (if it was created) and forgets it.
+    Called on application / worker shutdown.
+    """
+    if get_qdrant_service.cache_info().currsize:
+        get_qdrant_service().cleanup()
+        get_qdrant_service.cache_clear()
+
+async def get_async_qdrant_service() -> AsyncQdrantService:
+    """
+    Dependency function to get the shared AsyncQdrantService.
+    It is created lazily on first use so the client binds to the running event loop.
+    """
+    global _async_qdrant_service
+    if _async_qdrant_service is None:
+        _async_qdrant_service = AsyncQdrantService(
+            config=settings,
+            recipe_vector_cache=get_recipe_vector_cache(),
+            recipe_text_index=get_recipe_text_index(),
+        )
+    return _async_qdrant_service
+
+async def close_async_qdrant_service() -> None:
+    """
+    Closes the shared AsyncQdrantService (if it was created) and forgets it.
+    Called on application shutdown.
     """
-    return QdrantService(config=settings) 
\ No newline at end of file
+    global _async_qdrant_service
+    if _async_qdrant_service is not None:
+        await _async_qdrant_service.cleanup()
+        _async_qdrant_service = None
@@ -1,11 +1,39 @@
+import logging
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.concurrency import run_in_threadpool
 from app.api.api import api_router
+from app.core.config import settings
+from app.core.dependencies import (
+    get_qdrant_service,
+    close_qdrant_service,
+    close_async_qdrant_service,
+    get_recipe_vector_cache,
+    get_search_result_cache,
+    get_recipe_detail_cache,
+)
+
+logger = logging.getLogger(__name__)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if settings.QDRANT_BOOTSTRAP_ON_STARTUP:
+        # Payload indexes keep filtered scrolls off full scans; a Qdrant outage must not block startup
+        try:
+            await run_in_threadpool(get_qdrant_service().bootstrap_collections)
+        except Exception as e:
+            logger.warning(f"Qdrant bootstrap failed, run `make qdrant-bootstrap` once Qdrant is up: {e}")
+    yield
+    # Shared Qdrant client is opened lazily on first use, close it on shutdown
+    close_qdrant_service()
+    await close_async_qdrant_service()
 
 app = FastAPI(
     title="FRS API",
     description="Food Recipe System API",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS ayarları
@@ -34,4 +62,15 @@ async def health_check():
         "status": "healthy",
         "service": "FRS API",
         "version": "1.0.0"
-    } 
\ No newline at end of file
+    } 
+
+@app.get("/health/caches", tags=["Health Check"])
+async def cache_stats():
+    """
+    Hit ratio and memory use of the in-process caches of this worker.
+    """
+    return {
+        "recipe_details": get_recipe_detail_cache().stats(),
+        "recipe_vectors": get_recipe_vector_cache().stats(),
+        "search_results": get_search_result_cache().stats(),
+    }
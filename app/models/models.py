@@ -170,6 +170,17 @@ class Inventory(Base):
     
     user = relationship("User", backref="inventory_items")
     
+# Denormalized recipe documents: the serialized Recipe response of every recipe,
+# maintained by app.tasks.recipe_documents.refresh_recipe_documents
+class RecipeDocument(Base):
+    __tablename__ = "recipe_document"
+
+    recipe_id = Column(Integer, ForeignKey("recipe.recipe_id", ondelete="CASCADE"), primary_key=True)
+    document = Column(Text, nullable=False)
+    # app.utils.recipe_cache.DOCUMENT_FORMAT the document was serialized with
+    format_version = Column(Integer, nullable=False)
+    updated_at = Column(TIMESTAMP, default=datetime.datetime.utcnow, nullable=False)
+
 # Materialized Views
 class UserAllergiesView(Base):
     __tablename__ = "user_allergies"
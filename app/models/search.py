@@ -1,12 +1,28 @@
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import Dict, List, Literal, Optional
+
+from app.schemas.recipe_schema import NumericRange, RangeField
 
 class QueryClass(BaseModel):
     inputText: str = Field(..., description="The main search query text.")
     categories: List[str] = Field(default_factory=list, description="List of categories to filter by.")
     labels: List[str] = Field(default_factory=list, description="List of labels to filter by (all must match).")
+    ranges: Dict[RangeField, NumericRange] = Field(default_factory=dict, description="Inclusive bounds on total_time, calories, fat, protein and carb, e.g. {\"total_time\": {\"max\": 30}}. Recipes without the value are excluded.")
 
 class RecipeSearch(BaseModel):
     query: QueryClass
-    sortByField: Optional[str] = Field(default="name", description="Field to sort the results by (e.g., 'name', 'category').")
-    sortByDirection: Optional[str] = Field(default="ascending", description="Sort direction: 'ascending' or 'descending'.") 
\ No newline at end of file
+    sortByField: Optional[Literal["name", "category", "total_time", "calories", "score"]] = Field(default=None, description="Field to sort the results by; omit for match order (relevance in fulltext mode). Recipes without a value come last.")
+    sortByDirection: Literal["ascending", "descending"] = Field(default="ascending", description="Sort direction: 'ascending' or 'descending'.")
+    searchMode: Literal["keyword", "fulltext"] = Field(default="keyword", description="'keyword': exact matches of the text or its words; 'fulltext': tokenized, relevance-ranked search.")
+    limit: int = Field(default=50, ge=1, le=200, description="Maximum number of results per page.")
+    includeFacets: bool = Field(default=False, description="Also return per-category and per-label counts of all results of the query.")
+    cursor: Optional[str] = Field(default=None, description="Opaque cursor from a previous response's next_cursor; omit for the first page.")
+
+class SearchFacets(BaseModel):
+    categories: Dict[str, int] = Field(default_factory=dict, description="Number of matching recipes per category, most frequent first.")
+    labels: Dict[str, int] = Field(default_factory=dict, description="Number of matching recipes per label, most frequent first.")
+
+class RecipeSearchResponse(BaseModel):
+    results: List[dict] = Field(default_factory=list, description="Results of this page, in sortByField order.")
+    next_cursor: Optional[str] = Field(default=None, description="Cursor of the next page, or null when there are no more results.")
+    facets: Optional[SearchFacets] = Field(default=None, description="Present when includeFacets is set.") 
\ No newline at end of file
@@ -1,5 +1,6 @@
-from pydantic import BaseModel
-from typing import List, Dict, Optional, Union, Any
+from pydantic import BaseModel, Field, model_validator
+from typing import List, Dict, Literal, Optional, Tuple, Union, Any
+from app.core.config import settings
 from .ingredient_schema import RecipeIngredientDetail
 
 class Recipe(BaseModel):
@@ -32,4 +33,42 @@ class SaveRecipeRequest(BaseModel):
     recipe_ids: List[int]
 
     class Config:
-        from_attributes = True 
\ No newline at end of file
+        from_attributes = True
+
+# Numeric recipe fields that can be range-filtered (indexed in the Qdrant payload)
+RangeField = Literal["total_time", "calories", "fat", "protein", "carb"]
+
+class NumericRange(BaseModel):
+    min: Optional[float] = Field(default=None, description="Inclusive lower bound.")
+    max: Optional[float] = Field(default=None, description="Inclusive upper bound.")
+
+    @model_validator(mode="after")
+    def check_bounds(self):
+        if self.min is not None and self.max is not None and self.min > self.max:
+            raise ValueError("min must not be greater than max")
+        return self
+
+    def bounds(self) -> Tuple[Optional[float], Optional[float]]:
+        return self.min, self.max
+
+class BatchRecommendationRequest(BaseModel):
+    user_ids: List[str]
+    limit: int = Field(default=10, ge=1, le=settings.RECOMMENDATION_MAX_LIMIT, description="Recipes per user.")
+    ranges: Dict[RangeField, NumericRange] = Field(default_factory=dict)
+
+class BatchRecommendationResponse(BaseModel):
+    results: Dict[str, List[Recipe]]
+    errors: Dict[str, str]
+
+class RecipeBatchRequest(BaseModel):
+    recipe_ids: List[int] = Field(..., min_length=1)
+    # None: full recipe details; otherwise recipe card fields (list or comma-separated string)
+    fields: Optional[Union[List[str], str]] = None
+
+class RecipeBatchItem(BaseModel):
+    recipe_id: int
+    found: bool
+    recipe: Optional[Dict[str, Any]] = None
+
+class RecipeBatchResponse(BaseModel):
+    results: List[RecipeBatchItem]
@@ -0,0 +1,22 @@
+# app/scripts/bootstrap_qdrant.py
+"""
+Creates and verifies the Qdrant payload indexes used by filtered search.
+
+    python -m app.scripts.bootstrap_qdrant
+"""
+import json
+import sys
+
+from app.core.dependencies import get_qdrant_service, close_qdrant_service
+
+def main() -> int:
+    try:
+        report = get_qdrant_service().bootstrap_collections()
+    finally:
+        close_qdrant_service()
+    print(json.dumps(report, indent=2))
+    # Non-zero exit code if an index is missing or could not be verified
+    return 0 if all(result["status"] == "ok" for result in report.values()) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,495 @@
+# app/services/async_qdrant_service.py
+import asyncio
+import logging
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from qdrant_client import AsyncQdrantClient
+from qdrant_client.models import Filter
+
+from app.core.config import Settings
+from app.services.qdrant_service import BaseQdrantService
+from app.utils.catalog_version import get_catalog_version
+from app.utils.embedding_state import save_user_embedding_state
+from app.utils.search_cursor import decode_cursor, encode_cursor
+from app.utils.search_sort import ORDER_BY_PAYLOAD_FIELDS, top_k
+from app.utils.text_index import RecipeTextIndex
+from app.utils.vector_cache import VectorCache
+
+logger = logging.getLogger(__name__)
+
+class AsyncQdrantService(BaseQdrantService):
+    """
+    asyncio counterpart of QdrantService backed by AsyncQdrantClient, so vector
+    queries do not block the event loop. Filters, result processing and scoring
+    are shared with QdrantService through BaseQdrantService.
+    The client must be created inside the running event loop.
+    """
+    def __init__(
+        self,
+        config: Settings,
+        recipe_vector_cache: Optional[VectorCache] = None,
+        recipe_text_index: Optional[RecipeTextIndex] = None,
+    ):
+        super().__init__(config, recipe_vector_cache, recipe_text_index)
+        self._text_index_lock = asyncio.Lock()
+        self.client = AsyncQdrantClient(**self._client_options())
+
+    async def _ensure_collection(self, collection_name: str) -> bool:
+        if collection_name in self._known_collections:
+            return True
+        collections = await self.client.get_collections()
+        self._known_collections.update(c.name for c in collections.collections)
+        return collection_name in self._known_collections
+
+    # Get recipe embedding from the collection
+    async def get_recipe_embedding(self, recipe_id: int) -> Optional[List[float]]:
+        vectors, _ = await self.get_recipe_embeddings([recipe_id])
+        vector = vectors.get(int(recipe_id))
+        return vector.tolist() if vector is not None else None
+
+    # Get user embedding from the collection
+    async def get_user_embedding(self, user_id: int) -> Optional[List[float]]:
+        if not await self._ensure_collection(self.user_collection):
+            return None
+        try:
+            points = await self.client.retrieve(
+                collection_name=self.user_collection,
+                ids=[user_id],
+                with_vectors=True
+            )
+            if points and points[0].vector:
+                return self._full_vector(points[0].vector)
+            return None
+        except Exception as e:
+            logger.error(f"Error retrieving embedding of user {user_id}: {e}")
+            return None
+
+    # Get embeddings of many recipes with chunked retrieve calls
+    async def get_recipe_embeddings(self, recipe_ids: List[int]) -> Tuple[Dict[int, np.ndarray], List[int]]:
+        """
+        Same contract as QdrantService.get_recipe_embeddings; the chunks are fetched concurrently.
+        """
+        unique_ids = list(dict.fromkeys(int(recipe_id) for recipe_id in recipe_ids))
+        if not unique_ids:
+            return {}, []
+
+        if self.recipe_vector_cache.version_check_due:
+            await asyncio.to_thread(self.recipe_vector_cache.check_version)
+        vectors = self.recipe_vector_cache.get_many(unique_ids)
+        to_fetch = [recipe_id for recipe_id in unique_ids if recipe_id not in vectors]
+        if not to_fetch:
+            return vectors, []
+
+        if not await self._ensure_collection(self.recipe_collection):
+            logger.warning(f"Recipe collection {self.recipe_collection} not found, {len(to_fetch)} recipe vectors missing")
+            return vectors, to_fetch
+
+        chunks = [
+            to_fetch[start:start + self.retrieve_batch_size]
+            for start in range(0, len(to_fetch), self.retrieve_batch_size)
+        ]
+        responses = await asyncio.gather(
+            *[
+                self.client.retrieve(
+                    collection_name=self.recipe_collection,
+                    ids=chunk,
+                    with_payload=False,
+                    with_vectors=True
+                )
+                for chunk in chunks
+            ],
+            return_exceptions=True
+        )
+        for chunk, points in zip(chunks, responses):
+            if isinstance(points, Exception):
+                logger.error(f"Error retrieving {len(chunk)} recipe vectors: {points}")
+                continue
+            for point in points:
+                if point.vector:
+                    vector = np.asarray(self._full_vector(point.vector), dtype=np.float32)
+                    self.recipe_vector_cache.put(int(point.id), vector)
+                    vectors[int(point.id)] = vector
+
+        missing_ids = [recipe_id for recipe_id in to_fetch if recipe_id not in vectors]
+        return vectors, missing_ids
+
+    async def upsert_user(self, user_id: str, liked: list[int] = None, disliked: list[int] = None) -> dict:
+        """
+        Full rebuild of a user embedding, see QdrantService.upsert_user.
+        """
+        liked = [int(recipe_id) for recipe_id in liked or []]
+        disliked = [int(recipe_id) for recipe_id in disliked or []]
+        vectors, missing_ids = await self.get_recipe_embeddings(liked + disliked)
+        if missing_ids:
+            logger.warning(f"No vector found for recipes {missing_ids} while embedding user {user_id}")
+        state = self._embedding_state_from_vectors(vectors, liked, disliked)
+
+        if not await self._ensure_collection(self.user_collection):
+            await self.client.create_collection(
+                collection_name=self.user_collection,
+                vectors_config=self._user_vectors_config(),
+                quantization_config=self._quantization_config()
+            )
+            self._known_collections.add(self.user_collection)
+        # Projecting the reduced vector may read the projection from Redis
+        point = await asyncio.to_thread(self._user_point, user_id, self._user_vector_from_state(state), liked, disliked)
+        await self.client.upsert(
+            collection_name=self.user_collection,
+            points=[point],
+            wait=True
+        )
+        await asyncio.to_thread(self._invalidate_recommendations, user_id)
+        try:
+            await asyncio.to_thread(save_user_embedding_state, user_id, state)
+        except Exception as e:
+            logger.error(f"Error saving embedding state for user {user_id}: {e}")
+
+        return {
+            "status": "inserted",
+            "collection": self.user_collection,
+            "id": user_id,
+            "missing_recipes": missing_ids
+        }
+
+    # Search for recipes based on various filters
+    async def search_recipes(
+        self,
+        query_vec_param: Optional[List[float]] = None,
+        query: Optional[int] = None,
+        ingredients: Optional[List[str]] = None,
+        query_type: Optional[str] = "none",  # It can be "exact", "partial" or "none".
+        labels: Optional[List[str]] = None,
+        category: Optional[str] = None,
+        limit: int = 10,
+        similarity_threshold: float = 0.0,
+        upper_threshold: Optional[float] = None,
+        rescore: Optional[bool] = None,
+        oversampling: Optional[float] = None,
+        two_stage: Optional[bool] = None,
+        prefetch_factor: Optional[int] = None,
+        ranges: Optional[Dict[str, Tuple[Optional[float], Optional[float]]]] = None,
+    ) -> List[dict]:
+        try:
+            filters = self._create_filters(
+                ingredients=ingredients,
+                query_type=query_type,
+                labels=labels,
+                category=category,
+                ranges=ranges
+            )
+            query_vector = await self.get_recipe_embedding(query) if query else None
+
+            if not query_vector:
+                query_vector = query_vec_param
+
+            if query_vector:
+                prefetch = await asyncio.to_thread(self._prefetch, query_vector, limit, filters, two_stage, prefetch_factor)
+                search_response = await self.client.query_points(
+                    collection_name=self.recipe_collection,
+                    query=query_vector,
+                    prefetch=prefetch,
+                    query_filter=filters,
+                    search_params=self._search_params(rescore, oversampling),
+                    limit=limit,
+                    with_payload=True,
+                )
+                return self._process_search_results(
+                    search_response.points, similarity_threshold, upper_threshold
+                )
+            else:
+                records, _ = await self.client.scroll(
+                    collection_name=self.recipe_collection,
+                    scroll_filter=filters,
+                    limit=limit,
+                    with_payload=True,
+                )
+                return self._process_scroll_results(records)
+
+        except Exception as e:
+            logger.error(f"Search error: {e}")
+            raise
+
+    # This search for similar users.
+    async def _find_similar_users(
+        self,
+        user_id: int,
+        user_embedding: List[float],
+        top_n: Optional[int] = 3,
+        threshold: Optional[float] = -1.0,
+    ) -> Optional[List[tuple]]:
+        prefetch = await asyncio.to_thread(self._prefetch, user_embedding, top_n)
+        search_response = await self.client.query_points(
+            collection_name=self.user_collection,
+            query=user_embedding,
+            prefetch=prefetch,
+            search_params=self._search_params(),
+            limit=top_n,
+            with_payload=["user_id"],
+            score_threshold=threshold,
+        )
+        return self._similar_users_from_points(user_id, search_response.points)
+
+    # It returns liked and disliked recipe sets of many users with a single retrieve.
+    async def _get_users_interaction_sets(self, user_ids: List[int]) -> Dict[int, dict]:
+        if not user_ids:
+            return {}
+        points = await self.client.retrieve(
+            collection_name=self.user_collection,
+            ids=[int(user_id) for user_id in user_ids],
+            with_payload=["liked_recipes", "disliked_recipes"],
+            with_vectors=False,
+        )
+        return self._interaction_sets_from_points(points)
+
+    async def recommend_recipe(
+        self,
+        user_id: int,
+        ingredients: Optional[List[str]] = None,
+        query_type: str = "none",  # It can be "exact", "partial" or "none".
+        labels: Optional[List[str]] = None,
+        category: Optional[str] = None,
+        limit: int = 3,
+        two_stage: Optional[bool] = None,
+        prefetch_factor: Optional[int] = None,
+        ranges: Optional[Dict[str, Tuple[Optional[float], Optional[float]]]] = None) -> List[dict]:
+        """
+        Suggests recipes to the user, see QdrantService.recommend_recipe.
+        The similar-user lookup and the candidate search run concurrently.
+        """
+        user_vector = await self.get_user_embedding(user_id=user_id)
+        if not user_vector:
+            return []
+
+        async def similar_users_with_interactions():
+            similar_users = await self._find_similar_users(user_id=user_id, user_embedding=user_vector)
+            interactions = await self._get_users_interaction_sets(
+                [similar_user_id for similar_user_id, _ in similar_users or []]
+            )
+            return similar_users, interactions
+
+        candidate_search = self.search_recipes(
+            ingredients=ingredients,
+            query_type=query_type,
+            labels=labels,
+            category=category,
+            query_vec_param=user_vector,
+            limit=limit * 10,
+            two_stage=two_stage,
+            prefetch_factor=prefetch_factor,
+            ranges=ranges
+        )
+        (similar_users, interactions), candidate_recipes = await asyncio.gather(
+            similar_users_with_interactions(), candidate_search
+        )
+
+        return self._rank_candidates(candidate_recipes, similar_users, interactions)[:limit]
+
+    # This is to be used by search bar.
+    async def search_recipes_by_keywords(
+        self,
+        input_text: str,
+        limit: int = 10,
+        categories: Optional[List[str]] = None,
+        labels: Optional[List[str]] = None,
+    ) -> List[dict]:
+        """
+        First page of search_recipes_by_keywords_page, without the cursor.
+        """
+        results, _ = await self.search_recipes_by_keywords_page(input_text, limit, categories, labels)
+        return results
+
+    async def search_recipes_by_keywords_page(
+        self,
+        input_text: str,
+        limit: int = 10,
+        categories: Optional[List[str]] = None,
+        labels: Optional[List[str]] = None,
+        cursor: Optional[str] = None,
+        sort_by: Optional[str] = None,
+        descending: bool = False,
+        ranges: Optional[Dict[str, Tuple[Optional[float], Optional[float]]]] = None,
+    ) -> Tuple[List[dict], Optional[str]]:
+        """
+        1) Recipes whose payload fields contain the full input_text.
+        2) Recipes containing any individual word (and not matched by 1).
+        Returns up to `limit` results (full-string hits first) and an opaque cursor
+        for the next page, or None when both phases are exhausted. Each page
+        resumes the Qdrant scroll where the previous one stopped, so the cost per
+        page does not grow with its depth.
+        categories (any) and labels (all) are matched case-insensitively by Qdrant.
+        sort_by (see app.utils.search_sort) orders all hits when it is a
+        range-indexed field, otherwise each page; keyword hits have no "score".
+        Raises ValueError for an invalid cursor.
+        """
+        phase_filters = self._keyword_filters(input_text, categories, labels, ranges)
+        if not phase_filters:
+            return [], None
+
+        digest = self._search_query_digest("keyword", input_text, categories, labels, sort_by, descending, ranges)
+        if sort_by in ORDER_BY_PAYLOAD_FIELDS:
+            return await self._ordered_keyword_page(phase_filters, limit, cursor, digest, sort_by, descending)
+        phase, offset = decode_cursor(cursor, digest, self._valid_keyword_offset) if cursor else (0, None)
+
+        if phase >= len(phase_filters):
+            return [], None
+
+        # All remaining phases are requested at once so a page that needs the word
+        # phase costs one round trip; when the current phase alone fills the page
+        # (and has more hits) the later scrolls are cancelled instead of awaited.
+        scroll_tasks = [
+            asyncio.ensure_future(self.client.scroll(
+                collection_name=self.recipe_collection,
+                scroll_filter=phase_filters[i],
+                limit=limit,
+                offset=offset if i == phase else None,
+                with_payload=True,
+            ))
+            for i in range(phase, len(phase_filters))
+        ]
+        try:
+            first = await scroll_tasks[0]
+            if len(first[0]) >= limit and first[1] is not None:
+                scrolls = [first]
+            else:
+                scrolls = [first, *await asyncio.gather(*scroll_tasks[1:])]
+        finally:
+            for task in scroll_tasks:
+                if not task.done():
+                    task.cancel()
+        hits, next_cursor = self._assemble_keyword_page(phase, scrolls, limit, digest)
+        results = self._process_scroll_results(hits)
+        # Text fields cannot be ordered by Qdrant, they are sorted within the page
+        if sort_by is not None and sort_by != "score":
+            results = top_k(results, sort_by, descending)
+        return results, next_cursor
+
+    async def _ordered_keyword_page(
+        self,
+        phase_filters: List[Filter],
+        limit: int,
+        cursor: Optional[str],
+        digest: str,
+        sort_by: str,
+        descending: bool,
+    ) -> Tuple[List[dict], Optional[str]]:
+        """
+        Keyword search page ordered by a range-indexed payload field across all
+        hits (Qdrant order_by), followed by the hits without a value.
+        """
+        union_filter = self._keyword_union_filter(phase_filters)
+        phase, state = decode_cursor(cursor, digest, self._valid_ordered_state) if cursor else (0, None)
+
+        hits = []
+        while phase < 2 and len(hits) < limit:
+            wanted = limit - len(hits)
+            points, next_offset = await self.client.scroll(
+                collection_name=self.recipe_collection,
+                with_payload=True,
+                **self._ordered_keyword_scroll(union_filter, sort_by, descending, phase, state, wanted),
+            )
+            phase, state, points = self._next_ordered_state(sort_by, phase, state, points, next_offset, wanted)
+            hits.extend(points)
+
+        next_cursor = encode_cursor(phase, state, digest) if phase < 2 else None
+        return self._process_scroll_results(hits), next_cursor
+
+    async def search_facets(
+        self,
+        input_text: str,
+        mode: str = "keyword",
+        categories: Optional[List[str]] = None,
+        labels: Optional[List[str]] = None,
+        ranges: Optional[Dict[str, Tuple[Optional[float], Optional[float]]]] = None,
+        limit: Optional[int] = None,
+    ) -> Dict[str, Dict[str, int]]:
+        """
+        Per-category and per-label recipe counts of a search ("keyword" or
+        "fulltext" mode), most frequent first. Keyword facets are counted by
+        Qdrant's facet API over all hits of both phases, so no hit is downloaded.
+        """
+        limit = limit or self.config.SEARCH_FACET_LIMIT
+        if mode == "fulltext":
+            await self._ensure_text_index()
+            # Matching and counting walk every hit, keep it off the event loop
+            return await asyncio.to_thread(self._full_text_facets, input_text, categories, labels, ranges, limit)
+
+        phase_filters = self._keyword_filters(input_text, categories, labels, ranges)
+        if not phase_filters:
+            return {name: {} for name in self.FACET_FIELDS}
+        union_filter = self._keyword_union_filter(phase_filters)
+
+        responses = await asyncio.gather(*(
+            self.client.facet(
+                collection_name=self.recipe_collection,
+                key=payload_key,
+                facet_filter=union_filter,
+                limit=limit,
+                exact=True,
+            )
+            for payload_key in self.FACET_FIELDS.values()
+        ))
+        return {name: self._facet_counts(response) for name, response in zip(self.FACET_FIELDS, responses)}
+
+    async def _ensure_text_index(self) -> RecipeTextIndex:
+        """
+        (Re)builds the full-text index from the recipe payloads when it is stale.
+        While another task refreshes it after the TTL, the previous snapshot is
+        served; after a catalog update callers wait for the new one.
+        """
+        index = self.recipe_text_index
+        version = await asyncio.to_thread(get_catalog_version)
+        if not index.is_stale(version):
+            return index
+        outdated = not len(index) or (version is not None and version != index.version)
+        if not outdated and self._text_index_lock.locked():
+            return index
+        async with self._text_index_lock:
+            if index.is_stale(version):
+                points, offset = [], None
+                while True:
+                    batch, offset = await self.client.scroll(
+                        collection_name=self.recipe_collection,
+                        limit=1000,
+                        offset=offset,
+                        with_payload=self.TEXT_INDEX_PAYLOAD_FIELDS,
+                        with_vectors=False,
+                    )
+                    points.extend(batch)
+                    if offset is None:
+                        break
+                # Tokenizing the catalogue is CPU-bound, keep it off the event loop
+                await asyncio.to_thread(index.replace, list(self._text_index_documents(points)), version)
+                logger.info(f"Built recipe full-text index with {len(index)} documents.")
+        return index
+
+    async def search_recipes_full_text_page(
+        self,
+        input_text: str,
+        limit: int = 10,
+        categories: Optional[List[str]] = None,
+        labels: Optional[List[str]] = None,
+        cursor: Optional[str] = None,
+        sort_by: Optional[str] = None,
+        descending: bool = False,
+        ranges: Optional[Dict[str, Tuple[Optional[float], Optional[float]]]] = None,
+    ) -> Tuple[List[dict], Optional[str]]:
+        """
+        Tokenized, BM25-ranked search over recipe names, categories, labels and
+        ingredients. Any query word may match; recipes matching more (and rarer)
+        words rank higher. Returns up to `limit` results (with "score") and the
+        cursor of the next page, or None. Raises ValueError for an invalid cursor.
+        """
+        await self._ensure_text_index()
+        # BM25 scoring and the top-k selection walk every match, keep them off the event loop
+        return await asyncio.to_thread(
+            self._full_text_page, input_text, limit, categories, labels, cursor, sort_by, descending, ranges
+        )
+
+    #Cleanup resources
+    async def cleanup(self):
+        """Cleanup resources"""
+        try:
+            await self.client.close()
+        except Exception as e:
+            logger.error(f"Cleanup error: {e}")
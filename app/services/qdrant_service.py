@@ -1,5 +1,5 @@
 # app/services/qdrant_service.py
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple, Union
 import qdrant_client
 from qdrant_client import QdrantClient
 from qdrant_client.http.models import Filter as HttpFilter, MinShould
@@ -9,54 +9,948 @@ from qdrant_client.models import (
     MatchValue,
     VectorParams,
     PointStruct,
+    QueryRequest,
+    PayloadSchemaType,
+    ScalarQuantization,
+    ScalarQuantizationConfig,
+    ScalarType,
+    BinaryQuantization,
+    BinaryQuantizationConfig,
+    QuantizationSearchParams,
+    SearchParams,
+    VectorParamsDiff,
+    Disabled,
+    Prefetch,
+    PointVectors,
+    DenseVectorNameConfig,
+    DenseVectorConfig,
+    MatchAny,
+    SetPayload,
+    SetPayloadOperation,
+    OrderBy,
+    Direction,
+    IsEmptyCondition,
+    IsNullCondition,
+    PayloadField,
+    HasIdCondition,
+    Range,
 )
 import logging
+from collections import Counter
 from qdrant_client.http.models import VectorParams, PointStruct
 import qdrant_client.models
 from app.core.config import Settings
-import torch
-import os
+from app.utils.vector_cache import RECIPE_VECTORS_VERSION_KEY, VectorCache
+from app.utils.vector_projection import load_projection, load_write_projection, project
+from app.utils.search_cursor import decode_cursor, encode_cursor, is_int, is_number, is_point_id, query_digest
+from app.utils.text_index import FIELD_WEIGHTS, RecipeTextIndex
+from app.utils.search_sort import ORDER_BY_PAYLOAD_FIELDS, top_k
+from app.utils.recommendation_cache import invalidate_user_recommendations
+from app.utils.catalog_version import bump_catalog_version
+from app.utils.embedding_state import (
+    get_user_embedding_state,
+    save_user_embedding_state,
+    delete_user_embedding_state,
+)
+import numpy as np
+import httpx
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-class QdrantService:
-    def __init__(self, config:Settings):
+class BaseQdrantService:
+    """
+    Configuration and client-independent helpers (filters, result processing,
+    scoring) shared by QdrantService and AsyncQdrantService.
+    """
+    def __init__(
+        self,
+        config: Settings,
+        recipe_vector_cache: Optional[VectorCache] = None,
+        recipe_text_index: Optional[RecipeTextIndex] = None,
+    ):
         self.config = config
-        self.client = self._init_qdrant()
         self.vector_size = self.config.QDRANT_VECTOR_SIZE
         self.user_collection = self.config.QDRANT_COLLECTIONS[0]
         self.recipe_collection = self.config.QDRANT_COLLECTIONS[1]
+        self.retrieve_batch_size = self.config.QDRANT_RETRIEVE_BATCH_SIZE
+        # Recipe vectors rarely change, keep the hot ones in memory
+        if recipe_vector_cache is None:
+            recipe_vector_cache = VectorCache(
+                self.config.RECIPE_VECTOR_CACHE_MAX_BYTES, version_key=RECIPE_VECTORS_VERSION_KEY
+            )
+        self.recipe_vector_cache = recipe_vector_cache
+        # Full-text search index, built lazily from the recipe payloads
+        if recipe_text_index is None:
+            recipe_text_index = RecipeTextIndex(self.config.RECIPE_TEXT_INDEX_TTL_SECONDS)
+        self.recipe_text_index = recipe_text_index
+        # Names of collections known to exist. The app never drops collections,
+        # so only positive answers of get_collections are cached.
+        self._known_collections = set()
+
+    # Numeric Recipe columns copied into the recipe payload: column -> (payload key, index type)
+    NUMERIC_PAYLOAD_FIELDS = {
+        "total_time": ("TotalTime", PayloadSchemaType.INTEGER),
+        "calories": ("Calories", PayloadSchemaType.FLOAT),
+        "fat": ("Fat", PayloadSchemaType.FLOAT),
+        "protein": ("Protein", PayloadSchemaType.FLOAT),
+        "carb": ("Carb", PayloadSchemaType.FLOAT),
+    }
+
+    def payload_index_schema(self) -> Dict[str, Dict[str, PayloadSchemaType]]:
+        """Payload fields used in filters, per collection, with their index type."""
+        return {
+            self.recipe_collection: {
+                "Name": PayloadSchemaType.KEYWORD,
+                "Category": PayloadSchemaType.KEYWORD,
+                "Label": PayloadSchemaType.KEYWORD,
+                "Ingredients": PayloadSchemaType.KEYWORD,
+                "IngredientsCount": PayloadSchemaType.INTEGER,
+                "CategoryLower": PayloadSchemaType.KEYWORD,
+                "LabelLower": PayloadSchemaType.KEYWORD,
+                # Range indexes, also required for order_by
+                **{key: schema for key, schema in self.NUMERIC_PAYLOAD_FIELDS.values()},
+            },
+            self.user_collection: {
+                "user_id": PayloadSchemaType.INTEGER,
+            },
+        }
+
+    def _client_options(self) -> dict:
+        """Connection settings shared by the sync and async clients."""
         
+        host       = self.config.QDRANT_HOST
+        port       = self.config.QDRANT_PORT
+        grpc_port  = self.config.QDRANT_GRPC_PORT
+        prefer_grpc = self.config.QDRANT_PREFER_GRPC
+        timeout    = self.config.QDRANT_TIMEOUT
+        pool_size  = self.config.QDRANT_POOL_SIZE
+        keepalive  = self.config.QDRANT_KEEPALIVE_SECONDS
+
+        # HTTP URL'i hazırlıyoruz
+        url = f"http://{host}:{port}"
+
+        logging.info(f"Initializing {type(self).__name__} client → url={url}, grpc_port={grpc_port}, prefer_grpc={prefer_grpc}, pool_size={pool_size}")
+
+        if prefer_grpc:
+            # pool_size is the number of gRPC channels; keepalive pings keep them warm
+            connection_options = {
+                "pool_size": pool_size,
+                "grpc_options": {"grpc.keepalive_time_ms": keepalive * 1000},
+            }
+        else:
+            connection_options = {
+                "limits": httpx.Limits(
+                    max_connections=pool_size,
+                    max_keepalive_connections=pool_size,
+                    keepalive_expiry=keepalive,
+                ),
+            }
+
+        return {
+            "url": url,
+            "grpc_port": grpc_port,
+            "prefer_grpc": prefer_grpc,
+            "timeout": timeout,
+            **connection_options
+        }
+
+    def invalidate_recipe_embeddings(self, recipe_ids: List[int]) -> None:
+        """
+        Drops cached vectors of (re-)embedded recipes in this process and starts a
+        new cache generation, so every other process drops its vectors too.
+        """
+        self.recipe_vector_cache.invalidate(int(recipe_id) for recipe_id in recipe_ids)
+        self.recipe_vector_cache.bump_version()
+
+    def _embedding_state_from_vectors(
+        self, vectors: Dict[int, np.ndarray], liked: List[int], disliked: List[int]
+    ) -> dict:
+        liked_embedding = [vectors[recipe_id] for recipe_id in liked if recipe_id in vectors]
+        disliked_embedding = [vectors[recipe_id] for recipe_id in disliked if recipe_id in vectors]
+
+        return {
+            "liked_sum": np.stack(liked_embedding).sum(axis=0, dtype=np.float64) if liked_embedding else np.zeros(self.vector_size),
+            "liked_count": len(liked_embedding),
+            "disliked_sum": np.stack(disliked_embedding).sum(axis=0, dtype=np.float64) if disliked_embedding else np.zeros(self.vector_size),
+            "disliked_count": len(disliked_embedding),
+        }
+
+    def _user_vector_from_state(self, state: dict) -> List[float]:
+        user_vector = np.zeros(self.vector_size)
+        if state["liked_count"]:
+            user_vector += state["liked_sum"] / state["liked_count"]
+        if state["disliked_count"]:
+            user_vector -= state["disliked_sum"] / state["disliked_count"]
+        return user_vector.astype(np.float32).tolist()
+    
+    def _invalidate_recommendations(self, user_id) -> None:
+        # Cached recommendation lists were ranked with the previous user vector
+        try:
+            invalidate_user_recommendations(user_id)
+        except Exception as e:
+            logger.error(f"Error invalidating cached recommendations of user {user_id}: {e}")
+
+    def _user_vectors_config(self) -> Union[VectorParams, Dict[str, VectorParams]]:
+        full = VectorParams(
+            size=self.vector_size,
+            distance="Cosine",
+            on_disk=self.config.QDRANT_VECTORS_ON_DISK
+        )
+        if not self.config.QDRANT_TWO_STAGE_SEARCH:
+            return full
+        # Same layout as _ensure_reduced_vector gives existing collections
+        return {
+            "": full,
+            self.config.QDRANT_REDUCED_VECTOR_NAME: VectorParams(
+                size=self.config.QDRANT_REDUCED_VECTOR_DIM, distance="Cosine"
+            ),
+        }
+
+    def _quantization_config(self) -> Optional[Union[ScalarQuantization, BinaryQuantization]]:
+        """Quantization of both collections, see QDRANT_QUANTIZATION."""
+        mode = self.config.QDRANT_QUANTIZATION
+        always_ram = self.config.QDRANT_QUANTIZATION_ALWAYS_RAM
+        if mode == "scalar":
+            return ScalarQuantization(
+                scalar=ScalarQuantizationConfig(type=ScalarType.INT8, quantile=0.99, always_ram=always_ram)
+            )
+        if mode == "binary":
+            return BinaryQuantization(binary=BinaryQuantizationConfig(always_ram=always_ram))
+        if mode not in ("", "none"):
+            logger.warning(f"Unknown QDRANT_QUANTIZATION {mode!r}, vectors are not quantized")
+        return None
+
+    def _search_params(
+        self, rescore: Optional[bool] = None, oversampling: Optional[float] = None
+    ) -> Optional[SearchParams]:
+        """
+        Quantized search parameters: the quantized vectors pick oversampling * limit
+        candidates which are rescored with the original vectors.
+        None (server defaults) when quantization is off and nothing is overridden.
+        """
+        quantized = self.config.QDRANT_QUANTIZATION in ("scalar", "binary")
+        if not quantized and rescore is None and oversampling is None:
+            return None
+        return SearchParams(
+            quantization=QuantizationSearchParams(
+                rescore=self.config.QDRANT_SEARCH_RESCORE if rescore is None else rescore,
+                oversampling=self.config.QDRANT_SEARCH_OVERSAMPLING if oversampling is None else oversampling,
+            )
+        )
+
+    @staticmethod
+    def _full_vector(vector):
+        """The full-size vector of a retrieved point, also when it carries the reduced named vector."""
+        return vector.get("") if isinstance(vector, dict) else vector
+
+    def _reduced_vector(self, vector: List[float], for_write: bool = False) -> Optional[List[float]]:
+        """
+        PCA projection of a full vector, or None if two-stage search is off or no projection is available.
+        Written vectors use the projection being backfilled during a refit, queries only a published one.
+        """
+        if not self.config.QDRANT_TWO_STAGE_SEARCH:
+            return None
+        projection = load_write_projection() if for_write else load_projection()
+        if projection is None or projection["components"].shape != (self.config.QDRANT_REDUCED_VECTOR_DIM, len(vector)):
+            return None
+        return project(projection, vector).tolist()
+
+    def _point_vectors(self, vector: List[float]):
+        """Vector struct of an upserted point: the full vector, plus the reduced one when available."""
+        if not self.config.QDRANT_TWO_STAGE_SEARCH:
+            return vector
+        reduced = self._reduced_vector(vector, for_write=True)
+        if reduced is None:
+            # Named form, as the collection has the reduced vector too
+            return {"": vector}
+        return {"": vector, self.config.QDRANT_REDUCED_VECTOR_NAME: reduced}
+
+    def _prefetch(
+        self,
+        query_vector: List[float],
+        limit: int,
+        filters: Optional[Filter] = None,
+        two_stage: Optional[bool] = None,
+        prefetch_factor: Optional[int] = None,
+    ) -> Optional[Prefetch]:
+        """
+        First stage of two-stage search: limit * prefetch_factor candidates by the
+        reduced vector, which the main query then reranks with the full vector.
+        None (single-stage search) when disabled for the call or no projection is published.
+        Reads the projection from Redis when its local copy is due for a refresh.
+        """
+        if two_stage is None:
+            two_stage = self.config.QDRANT_TWO_STAGE_SEARCH
+        reduced = self._reduced_vector(query_vector) if two_stage else None
+        if reduced is None:
+            return None
+        factor = prefetch_factor or self.config.QDRANT_TWO_STAGE_PREFETCH_FACTOR
+        return Prefetch(
+            query=reduced,
+            using=self.config.QDRANT_REDUCED_VECTOR_NAME,
+            filter=filters,
+            limit=limit * factor,
+        )
+
+    def _user_point(self, user_id: str, user_vector: List[float], liked: List[int], disliked: List[int]) -> PointStruct:
+        return PointStruct(
+            id=int(user_id),
+            vector=self._point_vectors(user_vector),
+            payload={
+                "user_id": int(user_id),
+                "liked_recipes": liked,
+                "disliked_recipes": disliked
+            }
+        )
+
+    @staticmethod
+    def normalized_payload_fields(payload: dict) -> dict:
+        """
+        Lowercased copies of Category and Label, stored next to the originals so
+        category/label filters are case-insensitive inside Qdrant.
+        Recipe payloads must carry them; app.tasks.sync_recipe_payloads fills them
+        in for newly ingested points.
+        """
+        category = payload.get("Category")
+        labels = payload.get("Label")
+        if isinstance(labels, str):
+            labels = [labels]
+        elif not isinstance(labels, list):
+            labels = []
+        return {
+            "CategoryLower": category.lower() if isinstance(category, str) else None,
+            "LabelLower": [str(label).lower() for label in labels],
+        }
+
+    @staticmethod
+    def _missing_payload_filter(key: str) -> Filter:
+        """Points whose payload has no `key` at all; a stored null counts as present."""
+        return Filter(
+            must=[IsEmptyCondition(is_empty=PayloadField(key=key))],
+            must_not=[IsNullCondition(is_null=PayloadField(key=key))],
+        )
+
+    @classmethod
+    def numeric_payload_fields(cls, values: dict) -> dict:
+        """
+        Payload form of the numeric Recipe columns in `values` (column -> value).
+        Missing values are stored as None, which range filters and order_by skip.
+        """
+        payload = {}
+        for column, (key, schema) in cls.NUMERIC_PAYLOAD_FIELDS.items():
+            value = values.get(column)
+            if value is not None:
+                value = int(value) if schema == PayloadSchemaType.INTEGER else float(value)
+            payload[key] = value
+        return payload
+
+    def _payload_ranges(
+        self, ranges: Optional[Dict[str, Tuple[Optional[float], Optional[float]]]]
+    ) -> Dict[str, Tuple[Optional[float], Optional[float]]]:
+        """
+        Validates {column: (min, max)} bounds on the numeric Recipe columns and
+        returns them keyed by payload field. Bounds are inclusive, None leaves a
+        side open. Raises ValueError for unknown columns or min > max.
+        """
+        payload_ranges = {}
+        for column, (low, high) in (ranges or {}).items():
+            if column not in self.NUMERIC_PAYLOAD_FIELDS:
+                raise ValueError(f"Unknown range field: {column}")
+            if low is None and high is None:
+                continue
+            if low is not None and high is not None and low > high:
+                raise ValueError(f"Empty range for {column}: {low} > {high}")
+            payload_ranges[self.NUMERIC_PAYLOAD_FIELDS[column][0]] = (low, high)
+        return payload_ranges
+
+    def _range_conditions(
+        self, ranges: Optional[Dict[str, Tuple[Optional[float], Optional[float]]]] = None
+    ) -> List[FieldCondition]:
+        """Range conditions on the indexed numeric payload fields; recipes without a value never match."""
+        return [
+            FieldCondition(key=key, range=Range(gte=low, lte=high))
+            for key, (low, high) in self._payload_ranges(ranges).items()
+        ]
+
+    def _category_label_conditions(
+        self, categories: Optional[List[str]] = None, labels: Optional[List[str]] = None
+    ) -> List[FieldCondition]:
+        """Case-insensitive filter: any of the categories, all of the labels."""
+        conditions = []
+        if categories:
+            conditions.append(
+                FieldCondition(key="CategoryLower", match=MatchAny(any=[c.lower() for c in categories]))
+            )
+        for label in dict.fromkeys(label.lower() for label in labels or []):
+            conditions.append(FieldCondition(key="LabelLower", match=MatchValue(value=label)))
+        return conditions
+
+    def _create_filters(
+        self,
+        ingredients: Optional[List[str]] = None,
+        query_type: str = "none",
+        labels: Optional[List[str]] = None,
+        category: Optional[str] = None,
+        categories: Optional[List[str]] = None,
+        normalized_labels: Optional[List[str]] = None,
+        ranges: Optional[Dict[str, Tuple[Optional[float], Optional[float]]]] = None,
+    ) -> Filter:
+        """
+        labels / category match the payload exactly; categories / normalized_labels
+        match the lowercased payload fields case-insensitively; ranges bound the
+        numeric fields (see _range_conditions).
+        """
+        conditions = self._category_label_conditions(categories, normalized_labels)
+        conditions.extend(self._range_conditions(ranges))
+
+        # Ingredients filter
+        if ingredients:
+            if query_type == "exact":
+                # For exact match, first the IngredientsCount field in the payload should be equal to the length of the given ingredients list.
+                conditions.append(
+                    FieldCondition(key="IngredientsCount", match=MatchValue(value=len(ingredients)))
+                )
+                # Then, each ingredient must match exactly.
+                conditions.extend(
+                    [FieldCondition(key="Ingredients", match=MatchValue(value=ing)) for ing in ingredients]
+                )
+            elif query_type == "partial":
+                # For partial match, any of the given ingredients can match.
+                conditions.extend(
+                    [FieldCondition(key="Ingredients", match=MatchValue(value=ing)) for ing in ingredients]
+                )
+            # If query_type is "none", no ingredient filter is added.
+
+        # Labels filter: each label must match exactly (must contain all elements).
+        if labels:
+            conditions.extend(
+                [FieldCondition(key="Label", match=MatchValue(value=label)) for label in labels]
+            )
+
+        # For Category, direct exact match
+        if category:
+            conditions.append(
+                FieldCondition(key="Category", match=MatchValue(value=category))
+            )
+
+        return Filter(must=conditions)
+
+    # Process search results for similarity checked filter results
+    def _process_search_results(
+        self,
+        points: List[qdrant_client.models.ScoredPoint],
+        similarity_threshold: float,
+        upper_threshold: Optional[float],
+    ) -> List[dict]:
+        results = []
+        for point in points:
+            if (
+                similarity_threshold is not None
+                and point.score < similarity_threshold
+                or upper_threshold is not None
+                and point.score > upper_threshold
+            ):
+                continue
+            try:
+                payload = point.payload or {}
+                results.append(
+                    {
+                        "id": point.id,
+                        "name": payload.get('Name', 'No name available'),
+                        "category": payload.get('Category', 'No category available'),
+                        "label": payload.get('Label', 'No label available'),
+                        "score": point.score,
+                        "ingredients": payload.get('Ingredients', 'No ingredient names available'),
+                    }
+                )
+            except Exception as e:
+                print(f"The data field(s) is damaged: {e}")
+                continue
+        return results
+    
+    def _recipe_result(self, payload: dict) -> dict:
+        """Search result row of a recipe payload."""
+        row = {
+            "recipe_id": payload.get("recipe_id", "No recipe id available"),
+            "recipe_name": payload.get("Name", "No name available"),
+            "category": payload.get("Category", []),
+            "label": payload.get("Label", []),
+            "ingredients": payload.get("Ingredients", []),
+        }
+        for column, (key, _) in self.NUMERIC_PAYLOAD_FIELDS.items():
+            row[column] = payload.get(key)
+        return row
+
+    # Process scroll results for only filter results. No similarity check
+    def _process_scroll_results(
+        self,
+        points: List[qdrant_client.models.Record],
+    ) -> List[dict]:
+        results = []
+        if not points:
+            return []
+
+        for point in points:
+            try:
+                payload = point.payload or {}
+                results.append(self._recipe_result(payload))
+            except Exception as e:
+                logger.error(f"Error processing record {point.id} with payload {payload}: {e}")
+                continue
+        return results
+    
+    def _similar_users_from_points(
+        self, user_id: int, points: List[qdrant_client.models.ScoredPoint]
+    ) -> Optional[List[tuple]]:
+        similar_users = [(hit.payload["user_id"], hit.score)
+                         for hit in points
+                         if hit.payload["user_id"] != int(user_id)]
+        return similar_users or None
+
+    def _interaction_sets_from_points(self, points: List[qdrant_client.models.Record]) -> Dict[int, dict]:
+        interactions = {}
+        for point in points:
+            payload = point.payload or {}
+            liked = payload.get("liked_recipes")
+            disliked = payload.get("disliked_recipes")
+            interactions[int(point.id)] = {
+                "Liked": set(liked) if isinstance(liked, list) else set(),
+                "Disliked": set(disliked) if isinstance(disliked, list) else set(),
+            }
+        return interactions
+
+    def _rank_candidates(
+        self,
+        candidate_recipes: List[dict],
+        similar_users: Optional[List[tuple]],
+        interactions: Dict[int, dict],
+    ) -> List[dict]:
+        """
+        Adds the similarity score of every similar user who liked a candidate
+        (and subtracts it for dislikes) in one pass, then sorts by the result.
+        """
+        if not similar_users:
+            # If similar user is not found, we use base score according to user embedding query.
+            return sorted(candidate_recipes, key=lambda x: x["score"], reverse=True)
+
+        neighbours = [
+            (interactions[int(similar_user_id)], similarity_score)
+            for similar_user_id, similarity_score in similar_users
+            if int(similar_user_id) in interactions
+        ]
+        for recipe in candidate_recipes:
+            recipe_id = recipe["id"]
+            adjusted_score = recipe["score"]
+            for similar_interactions, similarity_score in neighbours:
+                if recipe_id in similar_interactions["Liked"]:
+                    adjusted_score += similarity_score
+                if recipe_id in similar_interactions["Disliked"]:
+                    adjusted_score -= similarity_score
+            recipe["final_score"] = adjusted_score
+        # Sort recipes according to their scores.
+        return sorted(candidate_recipes, key=lambda x: x["final_score"], reverse=True)
+    
+    KEYWORD_FIELDS = ["Name", "Category", "Label", "Ingredients"]
+
+    def _keyword_filters(
+        self,
+        input_text: str,
+        categories: Optional[List[str]] = None,
+        labels: Optional[List[str]] = None,
+        ranges: Optional[Dict[str, Tuple[Optional[float], Optional[float]]]] = None,
+    ) -> List[Filter]:
+        """
+        Builds the filters of the keyword search phases, in result order:
+        1) any payload field equal to the full lowercased text,
+        2) any field equal to one of its words, excluding the phase 1 hits.
+        The phases are disjoint, so each can be paged with its own scroll offset.
+        Both are restricted to the given categories (any), labels (all) and
+        numeric ranges. Returns [] for blank input; single-word input only needs phase 1.
+        """
+        must = self._category_label_conditions(categories, labels) + self._range_conditions(ranges) or None
+        text = input_text.strip().lower()
+        if not text:
+            return []
+
+        full_conditions = [
+            FieldCondition(key=key, match=MatchValue(value=text))
+            for key in self.KEYWORD_FIELDS
+        ]
+        full_filter = HttpFilter(
+            must=must,
+            min_should=MinShould(conditions=full_conditions, min_count=1)
+        )
+
+        words = list(dict.fromkeys(w for w in text.split() if w))
+        if words == [text]:
+            return [full_filter]
+
+        word_conditions = []
+        for word in words:
+            for key in self.KEYWORD_FIELDS:
+                word_conditions.append(
+                    FieldCondition(key=key, match=MatchValue(value=word))
+                )
+        word_filter = HttpFilter(
+            must=must,
+            must_not=full_conditions,
+            min_should=MinShould(conditions=word_conditions, min_count=1)
+        )
+        return [full_filter, word_filter]
+
+    @staticmethod
+    def _search_query_digest(
+        mode: str,
+        input_text: str,
+        categories: Optional[List[str]],
+        labels: Optional[List[str]],
+        sort_by: Optional[str] = None,
+        descending: bool = False,
+        ranges: Optional[Dict[str, Tuple[Optional[float], Optional[float]]]] = None,
+    ) -> str:
+        return query_digest(
+            mode,
+            input_text.strip().lower(),
+            sorted(c.strip().lower() for c in categories or []),
+            sorted(l.strip().lower() for l in labels or []),
+            sort_by,
+            descending,
+            sorted((column, list(bounds)) for column, bounds in (ranges or {}).items()),
+        )
+
+    def _assemble_keyword_page(
+        self,
+        phase: int,
+        scrolls: List[Tuple[List[qdrant_client.models.Record], Optional[object]]],
+        limit: int,
+        digest: str,
+    ) -> Tuple[List[qdrant_client.models.Record], Optional[str]]:
+        """
+        Merges the scroll results of consecutive keyword phases (starting at
+        `phase`, each fetched with `limit`) into one page, in phase order, and
+        returns it with the cursor of the next page (None when all are exhausted).
+        The phases are disjoint, so no deduplication is needed.
+        """
+        hits = []
+        for points, next_offset in scrolls:
+            room = limit - len(hits)
+            hits.extend(points[:room])
+            if len(points) > room:
+                # Scroll offsets are inclusive point ids, resume at the first unused hit
+                return hits, encode_cursor(phase, points[room].id, digest)
+            if next_offset is not None:
+                return hits, encode_cursor(phase, next_offset, digest)
+            phase += 1
+        return hits, None
+
+    # Facets of /searchRecipe: response key -> payload field (both keyword indexed)
+    FACET_FIELDS = {"categories": "Category", "labels": "Label"}
+
+    @staticmethod
+    def _facet_counts(response: qdrant_client.models.FacetResponse) -> Dict[str, int]:
+        return {str(hit.value): hit.count for hit in response.hits}
+
+    def _full_text_facets(
+        self,
+        input_text: str,
+        categories: Optional[List[str]],
+        labels: Optional[List[str]],
+        ranges: Optional[Dict[str, Tuple[Optional[float], Optional[float]]]],
+        limit: int,
+    ) -> Dict[str, Dict[str, int]]:
+        """Facet counts over the matches of the (already built) full-text index."""
+        matches = self.recipe_text_index.matches(input_text, categories, labels, self._payload_ranges(ranges))
+        facets = {}
+        for name, payload_key in self.FACET_FIELDS.items():
+            counts = Counter()
+            for _, payload in matches.values():
+                value = payload.get(payload_key)
+                values = value if isinstance(value, list) else [value] if value is not None else []
+                # A recipe counts once per value
+                counts.update({str(v) for v in values})
+            facets[name] = dict(counts.most_common(limit))
+        return facets
+
+    # Payload fields loaded into the full-text index
+    TEXT_INDEX_PAYLOAD_FIELDS = (
+        list(FIELD_WEIGHTS)
+        + ["recipe_id", "CategoryLower", "LabelLower"]
+        + [key for key, _ in NUMERIC_PAYLOAD_FIELDS.values()]
+    )
+
+    def _text_index_documents(self, points: List[qdrant_client.models.Record]):
+        for point in points:
+            payload = dict(point.payload or {})
+            # Points written before the normalised fields existed
+            if "CategoryLower" not in payload:
+                payload.update(self.normalized_payload_fields(payload))
+            yield point.id, payload
+
+    def _full_text_page(
+        self,
+        input_text: str,
+        limit: int,
+        categories: Optional[List[str]],
+        labels: Optional[List[str]],
+        cursor: Optional[str],
+        sort_by: Optional[str] = None,
+        descending: bool = False,
+        ranges: Optional[Dict[str, Tuple[Optional[float], Optional[float]]]] = None,
+    ) -> Tuple[List[dict], Optional[str]]:
+        """
+        Pages the matches of the (already built) full-text index, by relevance or
+        by `sort_by` over all matches (heap selection of the rows up to this page).
+        """
+        payload_ranges = self._payload_ranges(ranges)
+        digest = self._search_query_digest("fulltext", input_text, categories, labels, sort_by, descending, ranges)
+        _, offset = decode_cursor(cursor, digest, self._valid_full_text_offset) if cursor else (0, 0)
+
+        # One extra hit tells whether there is a next page
+        if sort_by is None or (sort_by == "score" and descending):
+            hits = self.recipe_text_index.search(input_text, limit + 1, offset, categories, labels, payload_ranges)
+            rows = [{**self._recipe_result(payload), "score": score} for _, score, payload in hits]
+        else:
+            matches = self.recipe_text_index.matches(input_text, categories, labels, payload_ranges)
+            rows = [{**self._recipe_result(payload), "score": score} for score, payload in matches.values()]
+            rows = top_k(rows, sort_by, descending, offset + limit + 1)[offset:]
+
+        next_cursor = encode_cursor(0, offset + limit, digest) if len(rows) > limit else None
+        return rows[:limit], next_cursor
+
+    @staticmethod
+    def _valid_full_text_offset(phase: int, offset) -> bool:
+        return phase == 0 and is_int(offset) and offset >= 0
+
+    @staticmethod
+    def _valid_keyword_offset(phase: int, offset) -> bool:
+        return offset is None or is_point_id(offset)
+
+    @staticmethod
+    def _valid_ordered_state(phase: int, state) -> bool:
+        """Cursor state of _ordered_keyword_scroll, see _next_ordered_state."""
+        if phase == 1:
+            return state is None or is_point_id(state)
+        if phase != 0:
+            return False
+        if state is None:
+            return True
+        if not isinstance(state, dict) or not is_number(state.get("v")) or not set(state) <= {"v", "id"}:
+            return False
+        return state.get("id") is None or is_point_id(state["id"])
+
+    def _keyword_union_filter(self, phase_filters: List[Filter]) -> Filter:
+        """Single filter matching the hits of every keyword phase."""
+        conditions = []
+        for phase_filter in phase_filters:
+            conditions.extend(phase_filter.min_should.conditions)
+        return HttpFilter(
+            must=phase_filters[0].must,
+            min_should=MinShould(conditions=conditions, min_count=1)
+        )
+
+    def _ordered_keyword_scroll(
+        self,
+        union_filter: Filter,
+        sort_by: str,
+        descending: bool,
+        phase: int,
+        state,
+        limit: int,
+    ) -> dict:
+        """
+        scroll() arguments of a keyword search ordered by a range-indexed field.
+        Phase 0 walks the hits with a value through order_by. The hits tied on the
+        value a page ended on are listed in id order instead (state {"v", "id"}),
+        so the cursor carries one value and one id however many hits share it.
+        Phase 1 scrolls the hits without a value, which order_by skips.
+        """
+        payload_key = ORDER_BY_PAYLOAD_FIELDS[sort_by]
+        must = list(union_filter.must or [])
+        if phase == 0:
+            if state is not None and "id" in state:
+                must.append(FieldCondition(key=payload_key, range=Range(gte=state["v"], lte=state["v"])))
+                scroll_filter = HttpFilter(must=must, min_should=union_filter.min_should)
+                return {"scroll_filter": scroll_filter, "offset": state["id"], "limit": limit}
+            if state is not None:
+                # Every hit of the value was returned, resume strictly after it
+                bound = Range(lt=state["v"]) if descending else Range(gt=state["v"])
+                must.append(FieldCondition(key=payload_key, range=bound))
+            order_by = OrderBy(
+                key=payload_key,
+                direction=Direction.DESC if descending else Direction.ASC,
+                start_from=state["v"] if state else None,
+            )
+            scroll_filter = HttpFilter(must=must or None, min_should=union_filter.min_should)
+            return {"scroll_filter": scroll_filter, "order_by": order_by, "limit": limit}
+
+        must.append(IsEmptyCondition(is_empty=PayloadField(key=payload_key)))
+        scroll_filter = HttpFilter(must=must, min_should=union_filter.min_should)
+        return {"scroll_filter": scroll_filter, "offset": state, "limit": limit}
+
+    def _next_ordered_state(
+        self,
+        sort_by: str,
+        phase: int,
+        state,
+        points: List[qdrant_client.models.Record],
+        next_offset,
+        limit: int,
+    ):
+        """
+        Cursor state after a scroll made with _ordered_keyword_scroll; returns
+        (phase, state, hits), hits being the points of the scroll to return.
+        """
+        if phase == 0:
+            if state is not None and "id" in state:
+                if next_offset is None:
+                    return 0, {"v": state["v"]}, points
+                return 0, {"v": state["v"], "id": next_offset}, points
+            # order_by pages carry no offset; a short page means the phase is done
+            if len(points) < limit:
+                return 1, None, points
+            # The hits tied on the last value are listed by id from the next scroll on
+            payload_key = ORDER_BY_PAYLOAD_FIELDS[sort_by]
+            last_value = points[-1].payload[payload_key]
+            hits = [point for point in points if point.payload.get(payload_key) != last_value]
+            return 0, {"v": last_value, "id": None}, hits
+        if next_offset is None:
+            return 2, None, points
+        return 1, next_offset, points
+
+
+class QdrantService(BaseQdrantService):
+    def __init__(
+        self,
+        config: Settings,
+        recipe_vector_cache: Optional[VectorCache] = None,
+        recipe_text_index: Optional[RecipeTextIndex] = None,
+    ):
+        super().__init__(config, recipe_vector_cache, recipe_text_index)
+        self.client = self._init_qdrant()
     
     def _init_qdrant(self) -> QdrantClient:
-        
-        host       = os.getenv("QDRANT_HOST", "localhost")
-        port       = int(os.getenv("QDRANT_PORT", 6333))
-        grpc_port  = int(os.getenv("QDRANT_GRPC_PORT", 6334))
-        prefer_grpc = os.getenv("PREFER_GRPC", "false").lower() in ("1","true","yes")
-        timeout    = int(os.getenv("QDRANT_TIMEOUT", 300))
+        return QdrantClient(**self._client_options())
+
+    def _ensure_collection(self, collection_name: str) -> bool:
+        if collection_name in self._known_collections:
+            return True
+        self._known_collections.update(c.name for c in self.client.get_collections().collections)
+        return collection_name in self._known_collections
 
-        # HTTP URL'i hazırlıyoruz
-        url = f"http://{host}:{port}"
+    def _migrate_collection_storage(self, collection_name: str) -> str:
+        """
+        Brings quantization and on-disk storage of an existing collection in line
+        with the settings via update_collection. Qdrant rebuilds the quantized
+        vectors in the background, the collection stays searchable meanwhile.
+        """
+        collection_config = self.client.get_collection(collection_name).config
+        vectors = collection_config.params.vectors
+        if isinstance(vectors, dict):
+            # The full vector is the unnamed default next to the reduced named vector
+            vectors = vectors.get("")
+        if not isinstance(vectors, VectorParams):
+            logger.warning(f"Collection {collection_name} has no default vector, storage migration skipped")
+            return "skipped"
 
-        logging.info(f"Initializing QdrantClient → url={url}, grpc_port={grpc_port}, prefer_grpc={prefer_grpc}")
+        desired_quantization = self._quantization_config()
+        on_disk = self.config.QDRANT_VECTORS_ON_DISK
+        quantization_changed = collection_config.quantization_config != desired_quantization
+        on_disk_changed = bool(vectors.on_disk) != on_disk
+        if not quantization_changed and not on_disk_changed:
+            return "unchanged"
 
-        return QdrantClient(
-            url=url,
-            grpc_port=grpc_port,
-            prefer_grpc=prefer_grpc,
-            timeout=timeout
+        self.client.update_collection(
+            collection_name=collection_name,
+            vectors_config={"": VectorParamsDiff(on_disk=on_disk)} if on_disk_changed else None,
+            quantization_config=(desired_quantization or Disabled.DISABLED) if quantization_changed else None,
+        )
+        logger.info(
+            f"Updated storage of {collection_name}: quantization={self.config.QDRANT_QUANTIZATION}, on_disk={on_disk}"
         )
+        return "updated"
 
-    def _ensure_collection(self, collection_name: str) -> bool:
-        existing_collections = [c.name for c in self.client.get_collections().collections]
-        if collection_name not in existing_collections:
-            return False
-        else:
-            return True
+    def _ensure_reduced_vector(self, collection_name: str) -> str:
+        """Adds the reduced named vector of two-stage search to an existing collection."""
+        if not self.config.QDRANT_TWO_STAGE_SEARCH:
+            return "disabled"
+        vectors = self.client.get_collection(collection_name).config.params.vectors
+        name = self.config.QDRANT_REDUCED_VECTOR_NAME
+        if isinstance(vectors, dict) and name in vectors:
+            return "exists"
+        self.client.create_vector_name(
+            collection_name=collection_name,
+            vector_name=name,
+            vector_name_config=DenseVectorNameConfig(
+                dense=DenseVectorConfig(size=self.config.QDRANT_REDUCED_VECTOR_DIM, distance="Cosine")
+            ),
+            wait=True
+        )
+        logger.info(f"Added vector {name} to {collection_name}, run app.tasks.reduced_vectors to fill it")
+        return "created"
+
+    def bootstrap_collections(self) -> dict:
+        """
+        Creates the user collection if needed, makes sure every field of
+        payload_index_schema is indexed and migrates the vector storage settings
+        (quantization, on_disk) of existing collections, adds the reduced vector of
+        two-stage search when enabled, then re-reads them to verify.
+        Returns a per-collection report; safe to run repeatedly.
+        """
+        self._known_collections.clear()
+        if not self._ensure_collection(self.user_collection):
+            self.client.create_collection(
+                collection_name=self.user_collection,
+                vectors_config=self._user_vectors_config(),
+                quantization_config=self._quantization_config()
+            )
+            self._known_collections.add(self.user_collection)
+
+        report = {}
+        for collection_name, fields in self.payload_index_schema().items():
+            if not self._ensure_collection(collection_name):
+                logger.warning(f"Collection {collection_name} not found, payload indexes not created")
+                report[collection_name] = {"status": "missing"}
+                continue
+
+            existing = self.client.get_collection(collection_name).payload_schema
+            created = []
+            for field_name, field_schema in fields.items():
+                if field_name in existing and existing[field_name].data_type == field_schema:
+                    continue
+                self.client.create_payload_index(
+                    collection_name=collection_name,
+                    field_name=field_name,
+                    field_schema=field_schema,
+                    wait=True
+                )
+                created.append(field_name)
+
+            storage = self._migrate_collection_storage(collection_name)
+            reduced_vector = self._ensure_reduced_vector(collection_name)
+
+            indexed = self.client.get_collection(collection_name).payload_schema
+            unindexed = [
+                field_name for field_name, field_schema in fields.items()
+                if field_name not in indexed or indexed[field_name].data_type != field_schema
+            ]
+            if unindexed:
+                logger.error(f"Payload indexes of {collection_name} could not be verified: {unindexed}")
+            report[collection_name] = {
+                "status": "ok" if not unindexed else "incomplete",
+                "created": created,
+                "unindexed": unindexed,
+                "storage": storage,
+                "reduced_vector": reduced_vector,
+            }
+            logger.info(f"Bootstrapped collection {collection_name}: {report[collection_name]}")
+        return report
 
     # Get recipe embedding from the collection
     def get_recipe_embedding(self, recipe_id: int) -> Optional[List[float]]:
+        cached = self.recipe_vector_cache.get(int(recipe_id))
+        if cached is not None:
+            return cached.tolist()
+
         if self._ensure_collection(self.recipe_collection) == False:
             return "No collection found"
         
@@ -70,8 +964,10 @@ class QdrantService:
                 ids=[recipe_id],
                 with_vectors=True
             )
-            if point and point[0].vector:
-                return point[0].vector
+            vector = self._full_vector(point[0].vector) if point else None
+            if vector:
+                self.recipe_vector_cache.put(int(recipe_id), vector)
+                return vector
             return None
         except Exception as e:
             return None
@@ -92,40 +988,86 @@ class QdrantService:
                 with_vectors=True
             )
             if point and point[0].vector:
-                return point[0].vector
+                return self._full_vector(point[0].vector)
             return None
         except Exception as e:
             return None
 
+    # Get embeddings of many recipes with chunked retrieve calls
+    def get_recipe_embeddings(self, recipe_ids: List[int]) -> Tuple[Dict[int, np.ndarray], List[int]]:
+        """
+        Retrieves embedding vectors (float32 arrays) for the given recipe IDs.
+        Cached vectors are served from memory, the rest are fetched from Qdrant
+        with at most `retrieve_batch_size` IDs per `retrieve` call.
+        Returns a {recipe_id: vector} mapping and the list of IDs without a vector.
+        """
+        unique_ids = list(dict.fromkeys(int(recipe_id) for recipe_id in recipe_ids))
+        if not unique_ids:
+            return {}, []
+
+        vectors = self.recipe_vector_cache.get_many(unique_ids)
+        to_fetch = [recipe_id for recipe_id in unique_ids if recipe_id not in vectors]
+        if not to_fetch:
+            return vectors, []
+
+        if not self._ensure_collection(self.recipe_collection):
+            logger.warning(f"Recipe collection {self.recipe_collection} not found, {len(to_fetch)} recipe vectors missing")
+            return vectors, to_fetch
+
+        for start in range(0, len(to_fetch), self.retrieve_batch_size):
+            chunk = to_fetch[start:start + self.retrieve_batch_size]
+            try:
+                points = self.client.retrieve(
+                    collection_name=self.recipe_collection,
+                    ids=chunk,
+                    with_payload=False,
+                    with_vectors=True
+                )
+            except Exception as e:
+                logger.error(f"Error retrieving {len(chunk)} recipe vectors: {e}")
+                continue
+            for point in points:
+                if point.vector:
+                    vector = np.asarray(self._full_vector(point.vector), dtype=np.float32)
+                    self.recipe_vector_cache.put(int(point.id), vector)
+                    vectors[int(point.id)] = vector
+
+        missing_ids = [recipe_id for recipe_id in to_fetch if recipe_id not in vectors]
+        return vectors, missing_ids
+
     # Calculate user embedding based on liked and disliked recipes
     def calculate_user_embeddings(
         self, liked: list[int]=None, disliked: list[int]=None
     ) -> Optional[List[float]]:
-        self._ensure_collection(self.user_collection)
-        
-        liked_embedding = []
-        if liked:
-            for recipe_id in liked:
-                liked_vector = self.get_recipe_embedding(recipe_id)
-                if liked_vector is not None:
-                    liked_embedding.append(liked_vector)
-
-        disliked_embedding = []
-        if disliked:
-            for recipe_id in disliked:
-                disliked_vector = self.get_recipe_embedding(recipe_id)
-                if disliked_vector is not None:
-                    disliked_embedding.append(disliked_vector)
-        
-        if not liked_embedding and not disliked_embedding:
-            return None
+        user_vector, missing_ids = self._calculate_user_embeddings(liked, disliked)
+        if missing_ids:
+            logger.warning(f"No vector found for recipes {missing_ids}, they are left out of the user embedding")
+        return user_vector
 
-        liked_tensor = torch.tensor(liked_embedding).mean(dim=0) if liked_embedding else torch.zeros(self.vector_size)
-        disliked_tensor = torch.tensor(disliked_embedding).mean(dim=0) if disliked_embedding else torch.zeros(self.vector_size)
+    def _calculate_user_embeddings(
+        self, liked: list[int]=None, disliked: list[int]=None
+    ) -> Tuple[Optional[List[float]], List[int]]:
+        """
+        Returns (mean(liked) - mean(disliked), IDs of recipes without a vector).
+        The vector is None when none of the recipes has a vector.
+        """
+        state, missing_ids = self._calculate_user_embedding_state(liked, disliked)
+        if not state["liked_count"] and not state["disliked_count"]:
+            return None, missing_ids
+        return self._user_vector_from_state(state), missing_ids
+
+    def _calculate_user_embedding_state(
+        self, liked: list[int]=None, disliked: list[int]=None
+    ) -> Tuple[dict, List[int]]:
+        """
+        Fetches all liked and disliked recipe vectors in one bulk lookup and
+        sums them per side. See app.utils.embedding_state for the state layout.
+        """
+        liked = [int(recipe_id) for recipe_id in liked or []]
+        disliked = [int(recipe_id) for recipe_id in disliked or []]
+        vectors, missing_ids = self.get_recipe_embeddings(liked + disliked)
+        return self._embedding_state_from_vectors(vectors, liked, disliked), missing_ids
 
-        user_vector = (liked_tensor - disliked_tensor).numpy().tolist()
-        return user_vector
-    
     def delete_user_embedding(self, user_id: str) -> dict:
         """
         Deletes a user embedding from the user collection in Qdrant.
@@ -139,42 +1081,100 @@ class QdrantService:
                 [int(user_id)],           # 2. arg. → points_selector (ID listesi)
                 wait=True
             )
+            delete_user_embedding_state(user_id)
+            self._invalidate_recommendations(user_id)
             return {"status": "deleted", "collection": self.user_collection, "id": user_id}
         except Exception as e:
             logger.error(f"Error deleting user embedding for user {user_id}: {e}")
             return {"status": "error", "message": str(e)}
 
     def upsert_user(self, user_id: str, liked: list[int] = None, disliked: list[int] = None) -> dict:
-        user_vector = self.calculate_user_embeddings(liked, disliked)
-        if not user_vector:
-            user_vector = [0.0] * self.vector_size
+        """
+        Full rebuild of a user embedding from the whole like/dislike history.
+        Also resets the running sums used by apply_user_interactions, so this is
+        the consistency repair path for incrementally maintained users.
+        """
+        state, missing_ids = self._calculate_user_embedding_state(liked, disliked)
+        if missing_ids:
+            logger.warning(f"No vector found for recipes {missing_ids} while embedding user {user_id}")
+
+        self._write_user_point(user_id, self._user_vector_from_state(state), liked or [], disliked or [])
+        try:
+            save_user_embedding_state(user_id, state)
+        except Exception as e:
+            logger.error(f"Error saving embedding state for user {user_id}: {e}")
+
+        return {
+            "status": "inserted",
+            "collection": self.user_collection,
+            "id": user_id,
+            "missing_recipes": missing_ids
+        }
+
+    def apply_user_interactions(self, user_id: str, events: List[dict]) -> Optional[dict]:
+        """
+        Updates a user embedding from queued interaction events (see
+        app.utils.embedding_tracker.record_user_interactions) in O(d) per event,
+        using the running sums saved by the last upsert_user.
+        Returns None when the incremental path cannot be used (no saved state,
+        no user point, or a recipe without a vector); callers then run upsert_user.
+        """
+        state = get_user_embedding_state(user_id, self.vector_size)
+        if state is None or not self._ensure_collection(self.user_collection):
+            return None
+
+        points = self.client.retrieve(
+            collection_name=self.user_collection,
+            ids=[int(user_id)],
+            with_payload=["liked_recipes", "disliked_recipes"],
+            with_vectors=False
+        )
+        if not points:
+            return None
+        payload = points[0].payload or {}
+        interactions = {
+            "liked": list(payload.get("liked_recipes") or []),
+            "disliked": list(payload.get("disliked_recipes") or []),
+        }
+
+        vectors, missing_ids = self.get_recipe_embeddings([event["recipe_id"] for event in events])
+        if missing_ids:
+            # Their contribution to the sums is unknown, rebuild from scratch
+            return None
+
+        for event in events:
+            kind = event["kind"]
+            recipe_id = int(event["recipe_id"])
+            recipe_ids = interactions[kind]
+            if event["added"] and recipe_id not in recipe_ids:
+                recipe_ids.append(recipe_id)
+                state[f"{kind}_sum"] += vectors[recipe_id]
+                state[f"{kind}_count"] += 1
+            elif not event["added"] and recipe_id in recipe_ids:
+                recipe_ids.remove(recipe_id)
+                state[f"{kind}_sum"] -= vectors[recipe_id]
+                state[f"{kind}_count"] -= 1
+
+        self._write_user_point(user_id, self._user_vector_from_state(state), interactions["liked"], interactions["disliked"])
+        save_user_embedding_state(user_id, state)
+
+        return {"status": "updated", "collection": self.user_collection, "id": user_id, "events": len(events)}
 
+    def _write_user_point(self, user_id: str, user_vector: List[float], liked: List[int], disliked: List[int]) -> None:
         if not self._ensure_collection(self.user_collection):
             self.client.create_collection(
                 collection_name=self.user_collection,
-                vectors_config=VectorParams(
-                    size=self.vector_size,
-                    distance="Cosine"
-                )
+                vectors_config=self._user_vectors_config(),
+                quantization_config=self._quantization_config()
             )
-
-        point = PointStruct(
-            id=int(user_id),
-            vector=user_vector,
-            payload={
-                "user_id": int(user_id),
-                "liked_recipes": liked or [],
-                "disliked_recipes": disliked or []
-            }
-        )
+            self._known_collections.add(self.user_collection)
 
         self.client.upsert(
             collection_name=self.user_collection,
-            points=[point],
+            points=[self._user_point(user_id, user_vector, liked, disliked)],
             wait=True
         )
-
-        return {"status": "inserted", "collection": self.user_collection, "id": user_id}
+        self._invalidate_recommendations(user_id)
 
 
     # Search for recipes based on various filters
@@ -189,13 +1189,25 @@ class QdrantService:
         limit: int = 10,
         similarity_threshold: float = 0.0,
         upper_threshold: Optional[float] = None,
+        rescore: Optional[bool] = None,
+        oversampling: Optional[float] = None,
+        two_stage: Optional[bool] = None,
+        prefetch_factor: Optional[int] = None,
+        ranges: Optional[Dict[str, Tuple[Optional[float], Optional[float]]]] = None,
     ) -> List[dict]:
+        """
+        rescore / oversampling override QDRANT_SEARCH_RESCORE / QDRANT_SEARCH_OVERSAMPLING
+        for this query when the collection is quantized.
+        two_stage / prefetch_factor override QDRANT_TWO_STAGE_SEARCH / QDRANT_TWO_STAGE_PREFETCH_FACTOR:
+        candidates are first drawn by the reduced vector, then reranked with the full vector.
+        """
         try:
             filters = self._create_filters(
                 ingredients=ingredients,
                 query_type=query_type,
                 labels=labels,
-                category=category
+                category=category,
+                ranges=ranges
             )
             query_vector = self.get_recipe_embedding(query) if query else None
             
@@ -206,7 +1218,9 @@ class QdrantService:
                 search_response = self.client.query_points(
                     collection_name=self.recipe_collection,
                     query=query_vector,
+                    prefetch=self._prefetch(query_vector, limit, filters, two_stage, prefetch_factor),
                     query_filter=filters,
+                    search_params=self._search_params(rescore, oversampling),
                     limit=limit,
                     with_payload=True,
                 )
@@ -227,153 +1241,42 @@ class QdrantService:
             logger.error(f"Search error: {e}")
             raise
 
-    def _create_filters(
-        self,
-        ingredients: Optional[List[str]] = None,
-        query_type: str = "none",
-        labels: Optional[List[str]] = None,
-        category: Optional[str] = None,
-    ) -> Filter:
-        conditions = []
-
-        # Ingredients filter
-        if ingredients:
-            if query_type == "exact":
-                # For exact match, first the IngredientsCount field in the payload should be equal to the length of the given ingredients list.
-                conditions.append(
-                    FieldCondition(key="IngredientsCount", match=MatchValue(value=len(ingredients)))
-                )
-                # Then, each ingredient must match exactly.
-                conditions.extend(
-                    [FieldCondition(key="Ingredients", match=MatchValue(value=ing)) for ing in ingredients]
-                )
-            elif query_type == "partial":
-                # For partial match, any of the given ingredients can match.
-                conditions.extend(
-                    [FieldCondition(key="Ingredients", match=MatchValue(value=ing)) for ing in ingredients]
-                )
-            # If query_type is "none", no ingredient filter is added.
-
-        # Labels filter: each label must match exactly (must contain all elements).
-        if labels:
-            conditions.extend(
-                [FieldCondition(key="Label", match=MatchValue(value=label)) for label in labels]
-            )
-
-        # For Category, direct exact match
-        if category:
-            conditions.append(
-                FieldCondition(key="Category", match=MatchValue(value=category))
-            )
-
-        return Filter(must=conditions)
-
-    # Process search results for similarity checked filter results
-    def _process_search_results(
-        self,
-        points: List[qdrant_client.models.ScoredPoint],
-        similarity_threshold: float,
-        upper_threshold: Optional[float],
-    ) -> List[dict]:
-        results = []
-        for point in points:
-            if (
-                similarity_threshold is not None
-                and point.score < similarity_threshold
-                or upper_threshold is not None
-                and point.score > upper_threshold
-            ):
-                continue
-            try:
-                results.append(
-                    {
-                        "id": point.id,
-                        "name": point.payload.get('Name', 'No name available'),
-                        "category": point.payload.get('Category', 'No category available'),
-                        "label": point.payload.get('Label', 'No label available'),
-                        "score": point.score,
-                        "ingredients": point.payload.get('Ingredients', 'No ingredient names available'),
-                    }
-                )
-            except Exception as e:
-                print(f"The data field(s) is damaged: {e}")
-                continue
-        return results
-    
-    # Process scroll results for only filter results. No similarity check
-    def _process_scroll_results(
-        self,
-        points: List[qdrant_client.models.Record],
-    ) -> List[dict]:
-        results = []
-        if not points:
-            return []
-
-        for point in points:
-            try:
-                payload = point.payload or {}
-                results.append(
-                    {
-                        "recipe_id": payload.get("recipe_id", "No recipe id available"),
-                        "recipe_name": payload.get("Name", "No name available"),
-                        "category": payload.get("Category", []),
-                        "label": payload.get("Label", []),
-                        "ingredients": payload.get("Ingredients", []),
-                    }
-                )
-            except Exception as e:
-                logger.error(f"Error processing record {point.id} with payload {payload}: {e}")
-                continue
-        return results
-    
     # This search for similar users.
     def _find_similar_users(
-        self, user_id: int, top_n: Optional[int] = 3, threshold: Optional[float] = -1.0
+        self,
+        user_id: int,
+        top_n: Optional[int] = 3,
+        threshold: Optional[float] = -1.0,
+        user_embedding: Optional[List[float]] = None,
     ) -> Optional[List[tuple]]:
         """
         Find similar users for given user id.
         """
-        user_embedding = self.get_user_embedding(user_id=user_id)
+        if user_embedding is None:
+            user_embedding = self.get_user_embedding(user_id=user_id)
         search_response = self.client.query_points(
             collection_name=self.user_collection,
             query=user_embedding,
+            prefetch=self._prefetch(user_embedding, top_n),
+            search_params=self._search_params(),
             limit=top_n,
-            with_payload=True,
+            with_payload=["user_id"],
             score_threshold=threshold,
         )
-        similar_users = [(hit.payload["user_id"], hit.score) 
-                        for hit in search_response.points 
-                        if hit.payload["user_id"] != user_id]
-        
-        if similar_users:
-            return similar_users
-        
-        return None
+        return self._similar_users_from_points(user_id, search_response.points)
     
-    # It returns liked and disliked recipes.
-    def _get_liked_disliked_recipes(self, user_id: int) -> Optional[dict]:
-        response = self.client.scroll(
+    # It returns liked and disliked recipe sets of many users with a single retrieve.
+    def _get_users_interaction_sets(self, user_ids: List[int]) -> Dict[int, dict]:
+        if not user_ids:
+            return {}
+        points = self.client.retrieve(
             collection_name=self.user_collection,
-            scroll_filter=Filter(
-                                    must=[
-                                        FieldCondition(key="user_id", match=MatchValue(value=user_id))
-                                    ]
-                                ),
-            with_vectors=True,
-            with_payload=True,
+            ids=[int(user_id) for user_id in user_ids],
+            with_payload=["liked_recipes", "disliked_recipes"],
+            with_vectors=False,
         )
-        
-        liked_list = []
-        disliked_list = []
-        
-        for point in response[0]:
-            liked_list = point.payload.get("liked_recipes", "No Liked Recipes Avaliable")
-            disliked_list = point.payload.get("disliked_recipes", "No Disliked Recipes Avaliable")
-        return {
-            "Liked": liked_list,
-            "Disliked": disliked_list
-        }
-    
+        return self._interaction_sets_from_points(points)
+
     def recommend_recipe(
         self, 
         user_id: int,
@@ -381,7 +1284,10 @@ class QdrantService:
         query_type: str = "none",  # It can be "exact", "partial" or "none".
         labels: Optional[List[str]] = None,
         category: Optional[str] = None, 
-        limit: int = 3) -> List[dict]:
+        limit: int = 3,
+        two_stage: Optional[bool] = None,
+        prefetch_factor: Optional[int] = None,
+        ranges: Optional[Dict[str, Tuple[Optional[float], Optional[float]]]] = None) -> List[dict]:
         
         """
         Suggests a recipe to the user.
@@ -389,17 +1295,22 @@ class QdrantService:
         The scores of the candidate recipes are then adjusted according to the likes and dislikes of similar users.
         2. If there are no similar users, the candidates are queried directly with the user's embedding.
         Each suggestion is returned as a dictionary with recipe information.
+        two_stage / prefetch_factor trade candidate recall for latency, see search_recipes.
+        ranges ({column: (min, max)}) bounds the numeric payload fields, see _range_conditions.
         """
 
-        # Step 1: Find similar users.
-        similar_users = self._find_similar_users(user_id=user_id)
-
-        # Step 2: Get user embedding.
+        # Step 1: Get user embedding.
         user_vector = self.get_user_embedding(user_id=user_id)
         
-        if not user_vector:
+        if not user_vector or isinstance(user_vector, str):
             return []
 
+        # Step 2: Find similar users and load their interactions once per request.
+        similar_users = self._find_similar_users(user_id=user_id, user_embedding=user_vector)
+        interactions = self._get_users_interaction_sets(
+            [similar_user_id for similar_user_id, _ in similar_users or []]
+        )
+
         # Search candidate recipes with user embedding, inventory and preferences.
         candidate_limit = limit * 10
         candidate_recipes = []
@@ -410,99 +1321,271 @@ class QdrantService:
                 labels=labels,
                 category=category,
                 query_vec_param=user_vector,
-                limit=candidate_limit 
+                limit=candidate_limit,
+                two_stage=two_stage,
+                prefetch_factor=prefetch_factor,
+                ranges=ranges
                 )
     
         except Exception as e:
             return []
 
         # Adjust recipe scores with similar users.
-        if similar_users:
-            for recipe in candidate_recipes:
-                recipe_id = recipe["id"]
-                adjusted_score = recipe["score"]
-                for similar_user_id, similarity_score in similar_users:
-                    similar_interactions = self._get_liked_disliked_recipes(similar_user_id)
-                    if similar_interactions:
-                        liked_recipes = similar_interactions.get("Liked")
-                        disliked_recipes = similar_interactions.get("Disliked")
-                        if liked_recipes and isinstance(liked_recipes, list) and recipe_id in liked_recipes:
-                            adjusted_score += similarity_score
-                        if disliked_recipes and isinstance(disliked_recipes, list) and recipe_id in disliked_recipes:
-                            adjusted_score -= similarity_score
-                recipe["final_score"] = adjusted_score
-            # Sort recipes according to their scores.
-            candidate_recipes.sort(key=lambda x: x["final_score"], reverse=True)
-        else:
-            # If similar user is not found, we use base score according to user embedding query.
-            candidate_recipes.sort(key=lambda x: x["score"], reverse=True)
-
-        top_recipes = candidate_recipes[:limit]
+        top_recipes = self._rank_candidates(candidate_recipes, similar_users, interactions)[:limit]
         return top_recipes
 
-    # This is to be used by search bar.
-    def search_recipes_by_keywords(
+    def recommend_recipes_for_vectors(
         self,
-        input_text: str,
-        limit: int = 10
-    ) -> List[dict]:
+        user_vectors: Dict[int, List[float]],
+        ingredients: Optional[List[str]] = None,
+        query_type: str = "none",  # It can be "exact", "partial" or "none".
+        labels: Optional[List[str]] = None,
+        category: Optional[str] = None,
+        limit: int = 3,
+        with_payload: bool = True,
+        ranges: Optional[Dict[str, Tuple[Optional[float], Optional[float]]]] = None,
+    ) -> Dict[int, List[dict]]:
         """
-        1) Find recipes whose payload fields contain the full input_text.
-        2) Find recipes containing any individual word.
-        3) Merge both sets (full-string hits first), dedupe by id, and return up to `limit`.
+        recommend_recipe for many users whose vectors are already known.
+        Similar users and candidates of all users are fetched with one
+        query_batch_points each, the interactions of all similar users with one retrieve.
+        with_payload=False skips the recipe payloads when only IDs and scores are needed.
         """
-        text = input_text.strip().lower()
-        if not text:
-            return []
+        user_ids = list(user_vectors)
+        if not user_ids:
+            return {}
 
-        # Phase 1: full-string match
-        full_conditions = [
-            FieldCondition(key=key, match=MatchValue(value=text))
-            for key in ["Name", "Category", "Label", "Ingredients"]
-        ]
-        full_filter = HttpFilter(
-            min_should=MinShould(conditions=full_conditions, min_count=1)
+        neighbour_responses = self.client.query_batch_points(
+            collection_name=self.user_collection,
+            requests=[
+                QueryRequest(
+                    query=user_vectors[user_id],
+                    prefetch=self._prefetch(user_vectors[user_id], 3),
+                    params=self._search_params(),
+                    limit=3,
+                    with_payload=["user_id"],
+                    score_threshold=-1.0,
+                )
+                for user_id in user_ids
+            ],
+        )
+        filters = self._create_filters(
+            ingredients=ingredients,
+            query_type=query_type,
+            labels=labels,
+            category=category,
+            ranges=ranges
         )
-        full_scroll = self.client.scroll(
+        candidate_responses = self.client.query_batch_points(
             collection_name=self.recipe_collection,
-            scroll_filter=full_filter,
-            limit=limit,
-            with_payload=True,
+            requests=[
+                QueryRequest(
+                    query=user_vectors[user_id],
+                    prefetch=self._prefetch(user_vectors[user_id], limit * 10, filters),
+                    filter=filters,
+                    params=self._search_params(),
+                    limit=limit * 10,
+                    with_payload=with_payload,
+                )
+                for user_id in user_ids
+            ],
         )
-        full_hits = full_scroll[0] if full_scroll else []
 
-        # Phase 2: per-word OR search
-        words = [w for w in text.split() if w]
-        word_conditions = []
-        for word in words:
-            for key in ["Name", "Category", "Label", "Ingredients"]:
-                word_conditions.append(
-                    FieldCondition(key=key, match=MatchValue(value=word))
+        similar_users = {
+            user_id: self._similar_users_from_points(user_id, response.points)
+            for user_id, response in zip(user_ids, neighbour_responses)
+        }
+        interactions = self._get_users_interaction_sets(list({
+            int(similar_user_id)
+            for neighbours in similar_users.values()
+            for similar_user_id, _ in neighbours or []
+        }))
+
+        recommendations = {}
+        for user_id, response in zip(user_ids, candidate_responses):
+            candidate_recipes = self._process_search_results(response.points, 0.0, None)
+            recommendations[user_id] = self._rank_candidates(
+                candidate_recipes, similar_users[user_id], interactions
+            )[:limit]
+        return recommendations
+
+    def recommend_recipes_for_users(
+        self,
+        user_ids: List[int],
+        limit: int = 3,
+        batch_size: int = 64,
+        **filters,
+    ) -> Tuple[Dict[int, List[dict]], Dict[int, str]]:
+        """
+        Batch recommend_recipe: user vectors are loaded with one retrieve, then
+        recommend_recipes_for_vectors runs on chunks of batch_size users.
+        Returns (recommendations, errors), both keyed by user ID; recommendations
+        only carry recipe IDs and scores.
+        """
+        user_ids = list(dict.fromkeys(int(user_id) for user_id in user_ids))
+        if not user_ids:
+            return {}, {}
+        if not self._ensure_collection(self.user_collection):
+            return {}, {user_id: "No embedding found for user" for user_id in user_ids}
+
+        points = self.client.retrieve(
+            collection_name=self.user_collection,
+            ids=user_ids,
+            with_payload=False,
+            with_vectors=True,
+        )
+        user_vectors = {int(point.id): self._full_vector(point.vector) for point in points if point.vector}
+        errors = {
+            user_id: "No embedding found for user"
+            for user_id in user_ids if user_id not in user_vectors
+        }
+
+        recommendations = {}
+        found_ids = [user_id for user_id in user_ids if user_id in user_vectors]
+        for start in range(0, len(found_ids), batch_size):
+            chunk = found_ids[start:start + batch_size]
+            try:
+                recommendations.update(self.recommend_recipes_for_vectors(
+                    {user_id: user_vectors[user_id] for user_id in chunk},
+                    limit=limit,
+                    with_payload=False,
+                    **filters,
+                ))
+            except Exception as e:
+                logger.error(f"Error recommending recipes for {len(chunk)} users: {e}")
+                errors.update({user_id: "Recommendation search failed" for user_id in chunk})
+        return recommendations, errors
+
+    def sync_normalized_payloads(self, batch_size: int = 256, only_missing: bool = True) -> int:
+        """
+        Backfills the normalized payload fields of the recipe points that lack
+        them (newly ingested ones), or of every point with only_missing=False,
+        one batch_update_points call per scrolled chunk. Returns the number of points updated.
+        """
+        if not self._ensure_collection(self.recipe_collection):
+            return 0
+        scroll_filter = self._missing_payload_filter("CategoryLower") if only_missing else None
+        updated_ids = []
+        offset = None
+        while True:
+            points, offset = self.client.scroll(
+                collection_name=self.recipe_collection,
+                scroll_filter=scroll_filter,
+                limit=batch_size,
+                offset=offset,
+                with_payload=["Category", "Label"],
+                with_vectors=False,
+            )
+            if points:
+                self.client.batch_update_points(
+                    collection_name=self.recipe_collection,
+                    update_operations=[
+                        SetPayloadOperation(set_payload=SetPayload(
+                            payload=self.normalized_payload_fields(point.payload or {}),
+                            points=[point.id],
+                        ))
+                        for point in points
+                    ],
+                    wait=True
                 )
-        word_filter = HttpFilter(
-            min_should=MinShould(conditions=word_conditions, min_count=1)
+                updated_ids.extend(int(point.id) for point in points)
+            if offset is None:
+                break
+        if updated_ids:
+            bump_catalog_version()
+            if only_missing:
+                # Points without the fields were (re-)ingested since the last run,
+                # their vectors may have changed
+                self.invalidate_recipe_embeddings(updated_ids)
+        return len(updated_ids)
+
+    def set_recipe_numeric_payloads(self, values: Dict[int, dict]) -> int:
+        """
+        Writes the numeric payload fields (see NUMERIC_PAYLOAD_FIELDS) of the given
+        recipes, {recipe_id: {column: value}}, in one batch_update_points call.
+        Recipes without a point are skipped. Returns the number of points updated.
+        """
+        if not values or not self._ensure_collection(self.recipe_collection):
+            return 0
+        values = {int(recipe_id): columns for recipe_id, columns in values.items()}
+        existing = self.client.retrieve(
+            collection_name=self.recipe_collection,
+            ids=list(values),
+            with_payload=False,
+            with_vectors=False,
         )
-        word_scroll = self.client.scroll(
+        point_ids = [point.id for point in existing]
+        if not point_ids:
+            return 0
+        self.client.batch_update_points(
             collection_name=self.recipe_collection,
-            scroll_filter=word_filter,
-            limit=limit,
-            with_payload=True,
+            update_operations=[
+                SetPayloadOperation(set_payload=SetPayload(
+                    payload=self.numeric_payload_fields(values[point_id]),
+                    points=[point_id],
+                ))
+                for point_id in point_ids
+            ],
+            wait=True
         )
-        word_hits = word_scroll[0] if word_scroll else []
-
-        # Merge and dedupe by point.id, preserving order (full first)
-        seen_ids = set()
-        merged = []
-        for hit in full_hits + word_hits:
-            if hit.id not in seen_ids:
-                seen_ids.add(hit.id)
-                merged.append(hit)
-            if len(merged) >= limit:
+        bump_catalog_version()
+        return len(point_ids)
+
+    def iter_recipe_ids_missing_payload(self, key: str, batch_size: int = 256):
+        """Walks the recipe points without the payload field `key` and yields their IDs in chunks of up to batch_size."""
+        if not self._ensure_collection(self.recipe_collection):
+            return
+        offset = None
+        while True:
+            points, offset = self.client.scroll(
+                collection_name=self.recipe_collection,
+                scroll_filter=self._missing_payload_filter(key),
+                limit=batch_size,
+                offset=offset,
+                with_payload=False,
+                with_vectors=False,
+            )
+            if points:
+                yield [int(point.id) for point in points]
+            if offset is None:
                 break
 
-        # Process and return as scroll results (no scores)
-        return self._process_scroll_results(merged)
-    
+    def iter_vectors(self, collection_name: str, batch_size: int = 256):
+        """Walks a collection and yields {point_id: full vector} chunks of up to batch_size points."""
+        if not self._ensure_collection(collection_name):
+            return
+        offset = None
+        while True:
+            points, offset = self.client.scroll(
+                collection_name=collection_name,
+                limit=batch_size,
+                offset=offset,
+                with_payload=False,
+                with_vectors=[""] if self.config.QDRANT_TWO_STAGE_SEARCH else True,
+            )
+            chunk = {int(point.id): self._full_vector(point.vector) for point in points if point.vector}
+            if chunk:
+                yield chunk
+            if offset is None:
+                break
+
+    def write_reduced_vectors(self, collection_name: str, reduced_vectors: Dict[int, List[float]]) -> None:
+        """Sets only the reduced named vector of existing points."""
+        if not reduced_vectors:
+            return
+        self.client.update_vectors(
+            collection_name=collection_name,
+            points=[
+                PointVectors(id=point_id, vector={self.config.QDRANT_REDUCED_VECTOR_NAME: vector})
+                for point_id, vector in reduced_vectors.items()
+            ],
+            wait=True
+        )
+
+    def iter_user_vectors(self, batch_size: int = 256):
+        """Walks the user collection and yields {user_id: vector} chunks of up to batch_size users."""
+        return self.iter_vectors(self.user_collection, batch_size)
+
     #Cleanup resources
     def cleanup(self):
         """Cleanup resources"""
@@ -1,142 +1,158 @@
-from sqlalchemy.orm import Session, joinedload
-from app.models.models import Recipe, RecipeIngr, SavedRecipes, LikedRecipe, User, DislikedRecipe, Ingredient as IngredientModel, Preference, PrefRecipe, Category as CategoryModel, RecipeCategoryLink
+from sqlalchemy.orm import Session, joinedload, load_only, selectinload
+from app.models.models import Recipe, RecipeIngr, SavedRecipes, LikedRecipe, User, DislikedRecipe, Ingredient as IngredientModel, Preference, PrefRecipe, Category as CategoryModel, RecipeCategoryLink, RecipeDocument
 from app.schemas.recipe_schema import Recipe as RecipeSchema
 from app.schemas.ingredient_schema import RecipeIngredientDetail
 from typing import Dict, List, Any, Union, Optional
 from sqlalchemy.sql import func
 from sqlalchemy import Integer, text
-from app.utils.embedding_tracker import mark_user_for_update
-
-# Qdrant ve Ayarlar için importlar
-from app.services.qdrant_service import QdrantService
+from app.utils.embedding_tracker import mark_user_for_update, record_user_interactions
+from app.utils.catalog_version import get_catalog_version
+from app.utils.recipe_cache import DOCUMENT_FORMAT
+from app.utils.recommendation_cache import (
+    recommendation_cache_key,
+    get_cached_recommendations,
+    cache_recommendations,
+    get_precomputed_recommendations,
+)
+
+# Qdrant için importlar
 from app.core.config import settings
+from app.core.dependencies import get_qdrant_service, get_recipe_detail_cache
+from app.services.async_qdrant_service import AsyncQdrantService
+from starlette.concurrency import run_in_threadpool
 import logging
 
 logger = logging.getLogger(__name__)
 
-# --- Helper function to build the label list ---
-def _build_recipe_label_list(db: Session, recipe: Recipe) -> List[str]:
-    """Helper function to create the label list (names of true preferences) for a given recipe."""
-    # Ensure pref_recipes and their preferences are loaded
-    if not hasattr(recipe, 'pref_recipes'): # Check if relationship was loaded
-         # If not loaded, query explicitly (less efficient)
-         recipe_pref_links = db.query(PrefRecipe).filter(PrefRecipe.recipe_id == recipe.recipe_id).options(joinedload(PrefRecipe.preference)).all()
-         recipe_pref_names = [pref_link.preference.pref_name 
-                              for pref_link in recipe_pref_links 
-                              if pref_link.preference and pref_link.preference.pref_name]
-    else:
-         # Use the pre-loaded relationship
-        recipe_pref_names = [pref_recipe.preference.pref_name 
-                             for pref_recipe in recipe.pref_recipes 
-                             if pref_recipe.preference and pref_recipe.preference.pref_name]
-
-    return sorted(recipe_pref_names)
-
-# --- Yeni Helper: Recipe ID için Category ismini bulma ---
-def _get_category_name_for_recipe(db: Session, recipe_id: int) -> Optional[str]:
-    """Queries recipe_cat and category tables to find the category name for a given recipe_id."""
-    link = db.query(RecipeCategoryLink).filter(RecipeCategoryLink.recipe_id == recipe_id).first()
-    if link and link.cat_id:
-        category = db.query(CategoryModel).filter(CategoryModel.category_id == link.cat_id).first()
-        if category:
-            return category.cat_name
-    return None
+# Recipe sütunları; /getRecipeCard bunlardan yalnızca istenenleri yükler
+RECIPE_CARD_COLUMNS = {column.name for column in Recipe.__table__.columns}
 
-def get_recipe_details(db: Session, recipe_id: int) -> RecipeSchema:
-    """Tarif detaylarını getir (category string olarak)"""
-    recipe = db.query(Recipe)\
-        .options(
-            joinedload(Recipe.recipe_ingredients).joinedload(RecipeIngr.ingredient),
-            joinedload(Recipe.pref_recipes).joinedload(PrefRecipe.preference)
-        )\
-        .filter(Recipe.recipe_id == recipe_id).first()
-    if recipe is None:
-        raise ValueError(f"Recipe with id {recipe_id} not found")
-    
+# --- Helper: yüklenmiş ilişkilerden malzeme ve etiket listelerini oluşturma ---
+def _ingredient_details(recipe_ingredients: List[RecipeIngr]) -> List[RecipeIngredientDetail]:
+    """Builds the ingredient list from loaded recipe_ingr rows (quantity and unit come from the recipe)."""
     ingredients_list = []
-    if recipe.recipe_ingredients:
-        for ri in recipe.recipe_ingredients:
-            if ri.ingredient:
-                ingredient_detail = RecipeIngredientDetail.model_validate(ri.ingredient, context={'quantity': ri.quantity, 'unit': ri.unit})
-                if not ingredient_detail.unit: # Check if None or empty string
-                    ingredient_detail.unit = "piece"
-                if ingredient_detail.quantity is None: # Check if quantity is None
-                    ingredient_detail.quantity = 1.0
-                ingredients_list.append(ingredient_detail)
-
-    label_list = _build_recipe_label_list(db, recipe)
-    category_name = _get_category_name_for_recipe(db, recipe.recipe_id)
-
-    # Önce modelden şemayı oluştur
+    for ri in recipe_ingredients or []:
+        if ri.ingredient:
+            ingredients_list.append(RecipeIngredientDetail(
+                ingr_name=ri.ingredient.ingr_name,
+                quantity=ri.quantity if ri.quantity is not None else 1.0,
+                # Tarifte birim yoksa malzemenin varsayılan birimi, o da yoksa "piece"
+                unit=ri.unit or ri.ingredient.default_unit or "piece",
+            ))
+    return ingredients_list
+
+def _label_names(pref_recipes: List[PrefRecipe]) -> List[str]:
+    return sorted([pref_recipe.preference.pref_name
+                   for pref_recipe in pref_recipes or []
+                   if pref_recipe.preference and pref_recipe.preference.pref_name])
+
+# --- Helper: yüklenmiş bir Recipe modelinden API şemasını oluşturma ---
+def _recipe_schema_from_model(recipe: Recipe, category_name: Optional[str]) -> RecipeSchema:
+    """Builds the RecipeSchema of a recipe whose ingredients and preferences are already loaded."""
+    ingredients_list = _ingredient_details(recipe.recipe_ingredients)
+    label_list = _label_names(recipe.pref_recipes)
+
+    # Önce modelden şemayı oluştur, sonra hesaplanan alanları ata (ingredients ismiyle)
     recipe_data = RecipeSchema.model_validate(recipe)
-    # Sonra hesaplanan alanları ata (ingredients ismiyle)
     recipe_data.ingredients = ingredients_list
     recipe_data.label = label_list
     recipe_data.category = category_name
     return recipe_data
 
-def get_recipe_card(db: Session, recipe_id: int, fields: Union[List[str], str]) -> Dict[str, Any]:
-    """Tarif kartı bilgilerini getir (category ismi recipe_cat'ten alınır)"""
+# --- Helper: tarif ID'leri için Category isimlerini bulma (recipe_cat + category) ---
+def _get_category_names_for_recipes(db: Session, recipe_ids: List[int]) -> Dict[int, str]:
+    """Queries recipe_cat and category tables for the category names of many recipes in one query."""
+    if not recipe_ids:
+        return {}
+    rows = db.query(RecipeCategoryLink.recipe_id, CategoryModel.cat_name)\
+        .join(CategoryModel, CategoryModel.category_id == RecipeCategoryLink.cat_id)\
+        .filter(RecipeCategoryLink.recipe_id.in_(recipe_ids))\
+        .all()
+    category_names = {}
+    for recipe_id, cat_name in rows:
+        # Same as .first() in the single version: keep one category per recipe
+        category_names.setdefault(recipe_id, cat_name)
+    return category_names
+
+def get_recipe_details(db: Session, recipe_id: int) -> RecipeSchema:
+    """Tarif detaylarını getir (category string olarak)"""
+    recipe_map = _load_recipe_schemas(db, [recipe_id])
+    if recipe_id not in recipe_map:
+        raise ValueError(f"Recipe with id {recipe_id} not found")
+    return recipe_map[recipe_id]
+
+def _parse_card_fields(fields: Union[List[str], str]) -> List[str]:
     if isinstance(fields, str):
-        fields = [f.strip() for f in fields.split(',')]
-    
-    # Determine if related data needs loading
-    query_options = []
+        fields = fields.split(',')
+    return list(dict.fromkeys(f.strip() for f in fields if f and f.strip()))
+
+def _load_recipe_cards(db: Session, recipe_ids: List[int], fields: List[str]) -> Dict[int, Dict[str, Any]]:
+    """
+    Tarif kartlarını ID'ye göre döner. Yalnızca istenen Recipe sütunları yüklenir
+    (load_only); malzeme, etiket ve kategori tabloları sadece istendiklerinde,
+    tüm tarifler için tek küme sorgusuyla okunur.
+    """
+    if not recipe_ids:
+        return {}
+    columns = [getattr(Recipe, field) for field in fields if field in RECIPE_CARD_COLUMNS and field != 'recipe_id']
+    # İstenmeyen sütunlar (ör. büyük instruction / ingredient metinleri) ertelenir, hiç okunmaz
+    query_options = [load_only(Recipe.recipe_id, *columns)]
     if 'ingredients' in fields:
-        query_options.append(joinedload(Recipe.recipe_ingredients).joinedload(RecipeIngr.ingredient))
+        query_options.append(selectinload(Recipe.recipe_ingredients).joinedload(RecipeIngr.ingredient))
+    if 'label' in fields:
+        query_options.append(selectinload(Recipe.pref_recipes).joinedload(PrefRecipe.preference))
+
+    recipes = db.query(Recipe).options(*query_options).filter(Recipe.recipe_id.in_(set(recipe_ids))).all()
+    category_names = _get_category_names_for_recipes(db, [recipe.recipe_id for recipe in recipes]) if 'category' in fields else {}
+
+    cards = {}
+    for recipe in recipes:
+        card = {}
+        for field in fields:
+            if field == 'ingredients':
+                card['ingredients'] = [ingredient.model_dump() for ingredient in _ingredient_details(recipe.recipe_ingredients)]
+            elif field == 'label':
+                card['label'] = _label_names(recipe.pref_recipes)
+            elif field == 'category':
+                card['category'] = category_names.get(recipe.recipe_id)
+            elif field in RECIPE_CARD_COLUMNS:
+                card[field] = getattr(recipe, field)
+        cards[recipe.recipe_id] = card
+    return cards
 
-    recipe = db.query(Recipe).options(*query_options).filter(Recipe.recipe_id == recipe_id).first()
-    if recipe is None:
+def get_recipe_card(db: Session, recipe_id: int, fields: Union[List[str], str]) -> Dict[str, Any]:
+    """Tarif kartı bilgilerini getir (yalnızca istenen alanlar yüklenir)"""
+    cards = _load_recipe_cards(db, [recipe_id], _parse_card_fields(fields))
+    if recipe_id not in cards:
         raise ValueError(f"Recipe with id {recipe_id} not found")
-    
-    result = {}
-    recipe_dict = {c.name: getattr(recipe, c.name) for c in recipe.__table__.columns}
-
-    for field in fields:
-        if field == 'ingredients':
-            result['ingredients'] = None # TODO: Ingredient yükleme mantığını gözden geçir
-        elif field == 'category':
-            result['category'] = _get_category_name_for_recipe(db, recipe_id)
-        elif field in recipe_dict:
-            result[field] = recipe_dict[field]
-    
-    return result
+    return cards[recipe_id]
+
+def get_recipes_batch(db: Session, recipe_ids: List[int], fields: Optional[Union[List[str], str]] = None) -> List[Dict[str, Any]]:
+    """
+    Birçok tarifi tek istekte, istek sırasıyla getirir. `fields` verilmezse tam
+    tarif detayı (önbellek ve toplu hidrasyon üzerinden), verilirse tarif kartı
+    döner. Bulunamayan ID'ler {"recipe_id": ..., "found": False, "recipe": None} olarak işaretlenir.
+    """
+    if len(recipe_ids) > settings.RECIPE_BATCH_MAX_IDS:
+        raise ValueError(f"At most {settings.RECIPE_BATCH_MAX_IDS} recipes can be requested at once")
+
+    if fields is None:
+        recipe_map = {recipe_id: schema.model_dump() for recipe_id, schema in _load_recipe_schemas(db, recipe_ids).items()}
+    else:
+        card_fields = _parse_card_fields(fields)
+        if not card_fields:
+            raise ValueError("At least one field must be requested")
+        recipe_map = _load_recipe_cards(db, list(dict.fromkeys(recipe_ids)), card_fields)
+
+    return [
+        {"recipe_id": recipe_id, "found": recipe_id in recipe_map, "recipe": recipe_map.get(recipe_id)}
+        for recipe_id in recipe_ids
+    ]
 
 def get_user_saved_recipes(db: Session, user_id: str) -> List[RecipeSchema]:
     """Kullanıcının kaydettiği tarifleri getir (category string olarak)"""
-    saved_recipes_query = db.query(Recipe)\
-        .join(SavedRecipes)\
-        .filter(SavedRecipes.user_id == user_id)\
-        .options(
-            joinedload(Recipe.recipe_ingredients).joinedload(RecipeIngr.ingredient),
-            joinedload(Recipe.pref_recipes).joinedload(PrefRecipe.preference)
-        )
-    saved_recipes = saved_recipes_query.all()
-    
-    result_list = []
-    for recipe in saved_recipes:
-        ingredients_list = []
-        if recipe.recipe_ingredients:
-            for ri in recipe.recipe_ingredients:
-                if ri.ingredient:
-                    ingredient_detail = RecipeIngredientDetail.model_validate(ri.ingredient, context={'quantity': ri.quantity, 'unit': ri.unit})
-                    if not ingredient_detail.unit: # Check if unit is None or empty
-                        ingredient_detail.unit = "piece"
-                    if ingredient_detail.quantity is None: # Check if quantity is None
-                        ingredient_detail.quantity = 1.0
-                    ingredients_list.append(ingredient_detail)
-        
-        label_list = sorted([pref_recipe.preference.pref_name
-                             for pref_recipe in recipe.pref_recipes
-                             if pref_recipe.preference and pref_recipe.preference.pref_name])
-        category_name = _get_category_name_for_recipe(db, recipe.recipe_id)
-
-        recipe_data = RecipeSchema.model_validate(recipe)
-        recipe_data.ingredients = ingredients_list
-        recipe_data.label = label_list
-        recipe_data.category = category_name
-        result_list.append(recipe_data)
-    return result_list
+    saved_ids = db.query(SavedRecipes.recipe_id).filter(SavedRecipes.user_id == user_id).all()
+    return hydrate_recipes(db, [row.recipe_id for row in saved_ids])
 
 def set_user_saved_recipes(db: Session, user_id: str, recipe_ids: List[int]):
     """Kullanıcının kaydettiği tarifleri güncelle"""
@@ -167,40 +183,24 @@ def get_user_liked_recipes(db: Session, user_id: str) -> List[RecipeSchema]:
     user = db.query(User).filter(User.user_id == user_id).first()
     if not user:
         raise ValueError(f"User with id {user_id} not found")
-        
-    liked_recipes_query = db.query(Recipe)\
-        .join(LikedRecipe)\
-        .filter(LikedRecipe.user_id == user_id)\
-        .options(
-            joinedload(Recipe.recipe_ingredients).joinedload(RecipeIngr.ingredient),
-            joinedload(Recipe.pref_recipes).joinedload(PrefRecipe.preference)
-        )
-    liked_recipes = liked_recipes_query.all()
-    
-    result_list = []
-    for recipe in liked_recipes:
-        ingredients_list = []
-        if recipe.recipe_ingredients:
-             for ri in recipe.recipe_ingredients:
-                 if ri.ingredient:
-                    ingredient_detail = RecipeIngredientDetail.model_validate(ri.ingredient, context={'quantity': ri.quantity, 'unit': ri.unit})
-                    if not ingredient_detail.unit:
-                        ingredient_detail.unit = "piece"
-                    if ingredient_detail.quantity is None:
-                        ingredient_detail.quantity = 1.0
-                    ingredients_list.append(ingredient_detail)
-        
-        label_list = sorted([pref_recipe.preference.pref_name
-                             for pref_recipe in recipe.pref_recipes
-                             if pref_recipe.preference and pref_recipe.preference.pref_name])
-        category_name = _get_category_name_for_recipe(db, recipe.recipe_id)
-
-        recipe_data = RecipeSchema.model_validate(recipe)
-        recipe_data.ingredients = ingredients_list
-        recipe_data.label = label_list
-        recipe_data.category = category_name
-        result_list.append(recipe_data)
-    return result_list
+
+    liked_ids = db.query(LikedRecipe.recipe_id).filter(LikedRecipe.user_id == user_id).all()
+    return hydrate_recipes(db, [row.recipe_id for row in liked_ids])
+
+def _queue_interactions(user_id: str, interactions: List[tuple]) -> None:
+    """
+    Queues committed like/dislike changes for the embedding job. Redis failures
+    do not fail the request: the user is queued for a full rebuild instead, or,
+    if Redis is down, picked up by the nightly rebuild.
+    """
+    try:
+        record_user_interactions(user_id, interactions)
+    except Exception as e:
+        logger.error(f"Error queuing interactions of user {user_id}: {e}")
+        try:
+            mark_user_for_update(user_id)
+        except Exception as e:
+            logger.error(f"Error queuing embedding rebuild of user {user_id}: {e}")
 
 def like_recipe(db: Session, user_id: str, recipe_id: int):
     """Kullanıcının bir tarifi beğenmesini sağla"""
@@ -234,6 +234,8 @@ def like_recipe(db: Session, user_id: str, recipe_id: int):
     except Exception as e:
         db.rollback()
         raise ValueError(f"Error liking recipe: {str(e)}")
+    if not existing_like:
+        _queue_interactions(user_id, [(recipe_id, "liked", True)])
 
 def unlike_recipe(db: Session, user_id: str, recipe_id: int):
     """Kullanıcının bir tarif beğenisini geri almasını sağla"""
@@ -257,50 +259,19 @@ def unlike_recipe(db: Session, user_id: str, recipe_id: int):
     
     try:
         db.commit()
-        mark_user_for_update(user_id)
     except Exception as e:
         db.rollback()
         raise ValueError(f"Error unliking recipe: {str(e)}")
+    _queue_interactions(user_id, [(recipe_id, "liked", False)])
 
 def get_user_disliked_recipes(db: Session, user_id: str) -> List[RecipeSchema]:
     """Kullanıcının beğenmediği tarifleri getir (category string olarak)"""
     user = db.query(User).filter(User.user_id == user_id).first()
     if not user:
         raise ValueError(f"User with id {user_id} not found")
-        
-    disliked_recipes_query = db.query(Recipe)\
-        .join(DislikedRecipe)\
-        .filter(DislikedRecipe.user_id == user_id)\
-        .options(
-            joinedload(Recipe.recipe_ingredients).joinedload(RecipeIngr.ingredient),
-            joinedload(Recipe.pref_recipes).joinedload(PrefRecipe.preference)
-        )
-    disliked_recipes = disliked_recipes_query.all()
-    
-    result_list = []
-    for recipe in disliked_recipes:
-        ingredients_list = []
-        if recipe.recipe_ingredients:
-             for ri in recipe.recipe_ingredients:
-                 if ri.ingredient:
-                    ingredient_detail = RecipeIngredientDetail.model_validate(ri.ingredient, context={'quantity': ri.quantity, 'unit': ri.unit})
-                    if not ingredient_detail.unit:
-                        ingredient_detail.unit = "piece"
-                    if ingredient_detail.quantity is None:
-                        ingredient_detail.quantity = 1.0
-                    ingredients_list.append(ingredient_detail)
-        
-        label_list = sorted([pref_recipe.preference.pref_name
-                             for pref_recipe in recipe.pref_recipes
-                             if pref_recipe.preference and pref_recipe.preference.pref_name])
-        category_name = _get_category_name_for_recipe(db, recipe.recipe_id)
-
-        recipe_data = RecipeSchema.model_validate(recipe)
-        recipe_data.ingredients = ingredients_list
-        recipe_data.label = label_list
-        recipe_data.category = category_name
-        result_list.append(recipe_data)
-    return result_list
+
+    disliked_ids = db.query(DislikedRecipe.recipe_id).filter(DislikedRecipe.user_id == user_id).all()
+    return hydrate_recipes(db, [row.recipe_id for row in disliked_ids])
 
 def dislike_recipe(db: Session, user_id: str, recipe_id: int):
     """Kullanıcının bir tarifi beğenmemesini sağla"""
@@ -317,6 +288,7 @@ def dislike_recipe(db: Session, user_id: str, recipe_id: int):
         .filter(DislikedRecipe.user_id == user_id, DislikedRecipe.recipe_id.cast(Integer) == recipe_id)\
         .first()
         
+    like_record = None
     if existing_dislike:
         # Zaten beğenilmemiş, sadece zaman damgasını güncelle
         existing_dislike.updated_at = func.now()
@@ -341,6 +313,13 @@ def dislike_recipe(db: Session, user_id: str, recipe_id: int):
     except Exception as e:
         db.rollback()
         raise ValueError(f"Error disliking recipe: {str(e)}")
+    interactions = []
+    if not existing_dislike:
+        interactions.append((recipe_id, "disliked", True))
+    if like_record:
+        interactions.append((recipe_id, "liked", False))
+    if interactions:
+        _queue_interactions(user_id, interactions)
 
 def undislike_recipe(db: Session, user_id: str, recipe_id: int):
     """Kullanıcının bir tarif beğenmemesini geri almasını sağla"""
@@ -364,10 +343,10 @@ def undislike_recipe(db: Session, user_id: str, recipe_id: int):
     
     try:
         db.commit()
-        mark_user_for_update(user_id)
     except Exception as e:
         db.rollback()
         raise ValueError(f"Error undisliking recipe: {str(e)}")
+    _queue_interactions(user_id, [(recipe_id, "disliked", False)])
     
 def get_user_liked_recipes_ids(db: Session, user_id: str) -> List[int]:
     """Return list of liked recipe IDs (for embedding only)"""
@@ -477,68 +456,167 @@ def get_surprise_recipe_id(db: Session, user_id: str) -> RecipeSchema:
         category=random_recipe.category
     )
 
-# --- YENİ FONKSİYON --- 
-def get_user_recommendations(db: Session, user_id: str, limit: int = 10) -> List[RecipeSchema]:
-    """Kullanıcı için Qdrant vektör araması kullanarak tarif önerileri getirir."""
+# --- Toplu hidrasyon ---
+def _load_recipe_schemas(db: Session, recipe_ids: List[int]) -> Dict[int, RecipeSchema]:
+    """
+    Verilen tarifleri ID'ye göre RecipeSchema olarak döner. Sırasıyla tarif detay
+    önbelleğine (bellek, sonra Redis), recipe_document tablosuna (etkinse) ve en
+    son ORM sorgularına bakılır; DB'den okunanlar mevcut katalog versiyonuyla
+    önbelleğe yazılır. Versiyon okunamazsa önbellek atlanır.
+    """
+    if not recipe_ids:
+        return {}
+    detail_cache = get_recipe_detail_cache()
+    version = get_catalog_version() if detail_cache.enabled else None
+    unique_ids = list(dict.fromkeys(recipe_ids))
+
+    documents = detail_cache.get_many(version, unique_ids) if version is not None else {}
+    missing_ids = [recipe_id for recipe_id in unique_ids if recipe_id not in documents]
+    stored = _fetch_recipe_documents(db, missing_ids) if missing_ids and settings.RECIPE_DOCUMENT_STORE_ENABLED else {}
+    documents.update(stored)
+    recipe_map = {recipe_id: RecipeSchema.model_validate_json(document) for recipe_id, document in documents.items()}
+
+    missing_ids = [recipe_id for recipe_id in missing_ids if recipe_id not in documents]
+    built = _query_recipe_schemas(db, missing_ids) if missing_ids else {}
+    recipe_map.update(built)
+
+    if version is not None and (stored or built):
+        fresh = dict(stored)
+        fresh.update({recipe_id: schema.model_dump_json().encode("utf-8") for recipe_id, schema in built.items()})
+        detail_cache.put_many(version, fresh)
+    return recipe_map
+
+def _fetch_recipe_documents(db: Session, recipe_ids: List[int]) -> Dict[int, bytes]:
+    """Hazır JSON belgelerini tek bir birincil anahtar sorgusuyla okur (ORM nesnesi oluşturmadan)."""
+    rows = db.query(RecipeDocument.recipe_id, RecipeDocument.document)\
+        .filter(RecipeDocument.recipe_id.in_(recipe_ids), RecipeDocument.format_version == DOCUMENT_FORMAT)\
+        .all()
+    return {row.recipe_id: row.document.encode("utf-8") for row in rows}
+
+def build_recipe_documents(db: Session, recipe_ids: List[int]) -> Dict[int, str]:
+    """recipe_document tablosu için tariflerin serileştirilmiş Recipe yanıtlarını oluşturur."""
+    return {recipe_id: schema.model_dump_json() for recipe_id, schema in _query_recipe_schemas(db, recipe_ids).items()}
+
+def _query_recipe_schemas(db: Session, recipe_ids: List[int]) -> Dict[int, RecipeSchema]:
+    """
+    Tarifleri DB'den yükler. Liste uzunluğundan bağımsız olarak sabit sayıda küme
+    sorgusu çalışır: tarifler, malzemeler, tercihler (selectinload ile IN sorguları)
+    ve kategoriler.
+    """
+    recipes = db.query(Recipe)\
+        .filter(Recipe.recipe_id.in_(set(recipe_ids)))\
+        .options(
+            selectinload(Recipe.recipe_ingredients).joinedload(RecipeIngr.ingredient),
+            selectinload(Recipe.pref_recipes).joinedload(PrefRecipe.preference)
+        )\
+        .all()
+    category_names = _get_category_names_for_recipes(db, [recipe.recipe_id for recipe in recipes])
+    return {
+        recipe.recipe_id: _recipe_schema_from_model(recipe, category_names.get(recipe.recipe_id))
+        for recipe in recipes
+    }
+
+def hydrate_recipes(db: Session, recipe_ids: List[int]) -> List[RecipeSchema]:
+    """Tarif ID'lerini, sırayı koruyarak RecipeSchema listesine çevirir; DB'de olmayan ID'ler atlanır."""
+    recipe_map = _load_recipe_schemas(db, recipe_ids)
+    return [recipe_map[recipe_id] for recipe_id in recipe_ids if recipe_id in recipe_map]
+
+def _hydrate_recommendations(db: Session, recommended_ids: List[int]) -> List[RecipeSchema]:
+    """Qdrant'ın önerdiği tarif ID'lerini, sırayı koruyarak RecipeSchema listesine çevirir."""
+    recipe_map = _load_recipe_schemas(db, recommended_ids)
+    
+    ordered_recipes = []
+    for rec_id in recommended_ids:
+        if rec_id in recipe_map:
+            ordered_recipes.append(recipe_map[rec_id])
+        else:
+            logger.warning(f"Recipe ID {rec_id} recommended by Qdrant but not found in DB.")
+
+    return ordered_recipes
+
+def _get_cached_recommendations(cache_key: Optional[str]) -> Optional[List[RecipeSchema]]:
+    cached = get_cached_recommendations(cache_key)
+    if cached is None:
+        return None
+    return [RecipeSchema.model_validate(recipe) for recipe in cached]
+
+def _cache_recommendations(cache_key: Optional[str], recipes: List[RecipeSchema]):
+    cache_recommendations(cache_key, [recipe.model_dump(mode="json") for recipe in recipes])
+
+def _precomputed_recommendation_ids(user_id: str, limit: int, filters: Optional[dict]) -> Optional[List[int]]:
+    # Offline lists are ranked without filters, they can only serve unfiltered requests
+    if filters:
+        return None
+    return get_precomputed_recommendations(user_id, limit)
+
+async def get_user_recommendations_async(
+    db: Session, user_id: str, qdrant_service: AsyncQdrantService, limit: int = 10, filters: Optional[dict] = None
+) -> List[RecipeSchema]:
+    """
+    Kullanıcı için Qdrant vektör araması kullanarak tarif önerileri getirir.
+    filters: recommend_recipe'ye iletilen ingredients / query_type / labels / category / ranges.
+    Sonuçlar kullanıcı, limit ve filtrelere göre Redis'te önbelleklenir (bkz. app.utils.recommendation_cache);
+    filtresiz isteklerde önce Celery'nin önceden hesapladığı top-K liste kullanılır.
+    Qdrant sorguları event loop'u bloklamaz; senkron SQLAlchemy hidrasyonu ve Redis
+    önbelleği thread pool'da çalışır.
+    """
     try:
-        qdrant_service = QdrantService(config=settings)
-        recommended_data = qdrant_service.recommend_recipe(user_id=int(user_id), limit=limit)
+        cache_key = await run_in_threadpool(recommendation_cache_key, user_id, limit, filters)
+        cached = await run_in_threadpool(_get_cached_recommendations, cache_key)
+        if cached is not None:
+            return cached
 
-        if not recommended_data:
-            logger.info(f"No recommendations found for user {user_id} from Qdrant.")
-            return []
+        recommended_ids = await run_in_threadpool(_precomputed_recommendation_ids, user_id, limit, filters)
+        if recommended_ids is None:
+            recommended_data = await qdrant_service.recommend_recipe(user_id=int(user_id), limit=limit, **(filters or {}))
+            recommended_ids = [item['id'] for item in recommended_data or []]
 
-        recommended_ids = [item['id'] for item in recommended_data]
-        
         if not recommended_ids:
-            return []
-
-        recipes = db.query(Recipe)\
-            .filter(Recipe.recipe_id.in_(recommended_ids))\
-            .options(
-                joinedload(Recipe.recipe_ingredients).joinedload(RecipeIngr.ingredient),
-                joinedload(Recipe.pref_recipes).joinedload(PrefRecipe.preference)
-            )\
-            .all()
-        
-        recipe_map = {recipe.recipe_id: recipe for recipe in recipes}
-        
-        ordered_recipes = []
-        for rec_id in recommended_ids:
-            if rec_id in recipe_map:
-                recipe = recipe_map[rec_id]
-                ingredients_list = []
-                if recipe.recipe_ingredients:
-                    for ri in recipe.recipe_ingredients:
-                        if ri.ingredient:
-                            ingredient_detail = RecipeIngredientDetail.model_validate(ri.ingredient, context={'quantity': ri.quantity, 'unit': ri.unit})
-                            if not ingredient_detail.unit:
-                                ingredient_detail.unit = "piece"
-                            if ingredient_detail.quantity is None:
-                                ingredient_detail.quantity = 1.0
-                            ingredients_list.append(ingredient_detail)
-                
-                # --- Build label list directly from pre-loaded data ---
-                label_list = sorted([pref_recipe.preference.pref_name 
-                                     for pref_recipe in recipe.pref_recipes 
-                                     if pref_recipe.preference and pref_recipe.preference.pref_name])
-                
-                category_name = _get_category_name_for_recipe(db, recipe.recipe_id)
-                
-                # Düzeltme: Önce validate et, sonra ata
-                recipe_data = RecipeSchema.model_validate(recipe)
-                recipe_data.ingredients = ingredients_list
-                recipe_data.label = label_list
-                recipe_data.category = category_name
-                ordered_recipes.append(recipe_data)
-            else:
-                logger.warning(f"Recipe ID {rec_id} recommended by Qdrant but not found in DB.")
-
-        return ordered_recipes
+            logger.info(f"No recommendations found for user {user_id} from Qdrant.")
+            recipes = []
+        else:
+            recipes = await run_in_threadpool(_hydrate_recommendations, db, recommended_ids)
+
+        await run_in_threadpool(_cache_recommendations, cache_key, recipes)
+        return recipes
 
     except ValueError as e:
         logger.error(f"Error getting recommendations for user {user_id}: {e}")
         raise
     except Exception as e:
         logger.exception(f"Unexpected error getting recommendations for user {user_id}: {e}")
-        return [] 
\ No newline at end of file
+        return []
+
+def get_batch_user_recommendations(
+    db: Session, user_ids: List[str], limit: int = 10, filters: Optional[dict] = None
+) -> Dict[str, Any]:
+    """
+    Birçok kullanıcı için toplu öneri: kullanıcı vektörleri tek retrieve ile,
+    aday aramaları query_batch_points ile, tüm tarifler tek SQL sorgusuyla yüklenir.
+    filters: recommend_recipes_for_users'a iletilen ingredients / query_type / labels / category / ranges.
+    Hata alan kullanıcılar "errors" altında döner, diğerlerinin sonucunu etkilemez.
+    """
+    if len(user_ids) > settings.BATCH_RECOMMENDATION_MAX_USERS:
+        raise ValueError(f"At most {settings.BATCH_RECOMMENDATION_MAX_USERS} users can be requested at once")
+    if not 1 <= limit <= settings.RECOMMENDATION_MAX_LIMIT:
+        raise ValueError(f"limit must be between 1 and {settings.RECOMMENDATION_MAX_LIMIT}")
+
+    errors = {}
+    numeric_ids = {}
+    for user_id in user_ids:
+        try:
+            numeric_ids[int(user_id)] = user_id
+        except (TypeError, ValueError):
+            errors[user_id] = "Invalid user id"
+
+    qdrant_service = get_qdrant_service()
+    recommendations, qdrant_errors = qdrant_service.recommend_recipes_for_users(list(numeric_ids), limit=limit, **(filters or {}))
+    errors.update({numeric_ids[user_id]: message for user_id, message in qdrant_errors.items()})
+
+    recipe_ids = list({recipe["id"] for ranked in recommendations.values() for recipe in ranked})
+    recipe_map = _load_recipe_schemas(db, recipe_ids) if recipe_ids else {}
+
+    results = {}
+    for user_id, ranked in recommendations.items():
+        results[numeric_ids[user_id]] = [recipe_map[recipe["id"]] for recipe in ranked if recipe["id"] in recipe_map]
+    return {"results": results, "errors": errors}
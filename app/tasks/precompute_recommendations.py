@@ -0,0 +1,48 @@
+# app/tasks/precompute_recommendations.py
+
+from app.celery_app import celery_app
+from app.core.config import settings
+from app.core.dependencies import get_qdrant_service
+from app.utils.recommendation_cache import (
+    get_recommendation_generations,
+    store_precomputed_recommendations,
+)
+import logging
+
+logger = logging.getLogger(__name__)
+
+@celery_app.task
+def precompute_user_recommendations(batch_size: int = None):
+    """
+    Celery task to rank the top-K recipes of every user in the user collection
+    and store them in Redis, so /getUserRecommendations can skip vector search.
+    Users are processed in chunks with batched Qdrant queries.
+    """
+    qdrant = get_qdrant_service()
+    top_k = settings.PRECOMPUTED_RECOMMENDATIONS_TOP_K
+    stored = 0
+    try:
+        for user_vectors in qdrant.iter_user_vectors(batch_size or settings.PRECOMPUTE_BATCH_SIZE):
+            # Read generations first: a list computed across an invalidation lands under the old one
+            generations = get_recommendation_generations(list(user_vectors))
+            try:
+                recommendations = qdrant.recommend_recipes_for_vectors(
+                    user_vectors, limit=top_k, with_payload=False
+                )
+            except Exception as e:
+                logger.error(f"Error precomputing recommendations for {len(user_vectors)} users: {e}")
+                continue
+
+            store_precomputed_recommendations({
+                user_id: (
+                    generations[user_id],
+                    [(recipe["id"], recipe.get("final_score", recipe["score"])) for recipe in ranked],
+                )
+                for user_id, ranked in recommendations.items()
+            })
+            stored += len(recommendations)
+
+        logger.info(f"Precomputed recommendations for {stored} users.")
+
+    except Exception as e:
+        logger.exception(f"Error in precompute_user_recommendations: {e}")
@@ -0,0 +1,70 @@
+# app/tasks/recipe_documents.py
+
+from app.celery_app import celery_app
+from app.core.database import SessionLocal
+from app.models.models import Recipe, RecipeDocument
+from app.services import recipe_service
+from app.utils.catalog_version import bump_catalog_version
+from app.utils.recipe_cache import DOCUMENT_FORMAT
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy import text
+from sqlalchemy.sql import func
+import logging
+
+logger = logging.getLogger(__name__)
+
+@celery_app.task
+def refresh_recipe_documents(batch_size: int = 500):
+    """
+    Celery task to rebuild the denormalized recipe_document table: one ready-to-serve
+    Recipe JSON per recipe, built by the same code as the API responses. Creates the
+    table on first run, upserts every recipe in batches, drops documents of deleted
+    recipes and bumps the catalog version so cached recipe details are rebuilt.
+    Idempotent; re-run after editing recipes, ingredients, labels or categories.
+    """
+    db = None
+    try:
+        db = SessionLocal()
+        RecipeDocument.__table__.create(bind=db.get_bind(), checkfirst=True)
+        # Tables created before documents carried a format get the column; their rows are rewritten below
+        db.execute(text("ALTER TABLE recipe_document ADD COLUMN IF NOT EXISTS format_version INTEGER NOT NULL DEFAULT 0"))
+
+        recipe_ids = [row.recipe_id for row in db.query(Recipe.recipe_id).order_by(Recipe.recipe_id)]
+        refreshed = 0
+        for start in range(0, len(recipe_ids), batch_size):
+            refreshed += _upsert_documents(db, recipe_ids[start:start + batch_size])
+
+        removed = db.query(RecipeDocument)\
+            .filter(~RecipeDocument.recipe_id.in_(db.query(Recipe.recipe_id)))\
+            .delete(synchronize_session=False)
+        db.commit()
+        bump_catalog_version()
+        logger.info(f"Refreshed {refreshed} recipe documents, removed {removed}.")
+    except Exception as e:
+        if db is not None:
+            db.rollback()
+        logger.exception(f"Error in refresh_recipe_documents: {e}")
+    finally:
+        if db is not None:
+            db.close()
+
+def _upsert_documents(db, recipe_ids) -> int:
+    documents = recipe_service.build_recipe_documents(db, recipe_ids)
+    if not documents:
+        return 0
+    statement = insert(RecipeDocument).values([
+        {"recipe_id": recipe_id, "document": document, "format_version": DOCUMENT_FORMAT}
+        for recipe_id, document in documents.items()
+    ])
+    statement = statement.on_conflict_do_update(
+        index_elements=[RecipeDocument.recipe_id],
+        set_={
+            "document": statement.excluded.document,
+            "format_version": statement.excluded.format_version,
+            "updated_at": func.now(),
+        },
+    )
+    db.execute(statement)
+    # Keep the session's identity map small between batches
+    db.expunge_all()
+    return len(documents)
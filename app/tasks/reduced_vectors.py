@@ -0,0 +1,68 @@
+# app/tasks/reduced_vectors.py
+
+from app.celery_app import celery_app
+from app.core.config import settings
+from app.core.dependencies import get_qdrant_service
+from app.utils.vector_projection import (
+    PROJECTION_REFRESH_SECONDS,
+    fit_projection,
+    project,
+    publish_projection,
+    stage_projection,
+)
+import numpy as np
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+@celery_app.task
+def refit_reduced_vectors(sample_size: int = 20000, batch_size: int = 256):
+    """
+    Offline step of two-stage search: fits the PCA projection on (a sample of)
+    the recipe vectors, backfills the reduced named vector of every recipe and
+    user point with it and only then publishes it for queries. Meanwhile searches
+    fall back to single-stage search. Run after enabling QDRANT_TWO_STAGE_SEARCH
+    and the bootstrap, and again when the recipe embeddings change substantially.
+    """
+    if not settings.QDRANT_TWO_STAGE_SEARCH:
+        logger.warning("QDRANT_TWO_STAGE_SEARCH is disabled, nothing to refit.")
+        return
+
+    qdrant = get_qdrant_service()
+    try:
+        sample = []
+        for chunk in qdrant.iter_vectors(qdrant.recipe_collection, batch_size):
+            sample.extend(chunk.values())
+            if len(sample) >= sample_size:
+                break
+        if not sample:
+            logger.warning("No recipe vectors found, projection not fitted.")
+            return
+
+        projection = fit_projection(np.asarray(sample[:sample_size], dtype=np.float32), settings.QDRANT_REDUCED_VECTOR_DIM)
+        if projection["components"].shape[0] != settings.QDRANT_REDUCED_VECTOR_DIM:
+            logger.error(f"Only {projection['components'].shape[0]} components could be fitted from {len(sample)} vectors.")
+            return
+        version = stage_projection(projection)
+        logger.info(f"Fitted projection v{version} on {len(sample)} recipe vectors.")
+        # Let every process pick up the staged projection, so points written
+        # during the backfill already get the new reduced vector
+        time.sleep(PROJECTION_REFRESH_SECONDS + 5)
+
+        for collection_name in (qdrant.recipe_collection, qdrant.user_collection):
+            written = 0
+            for chunk in qdrant.iter_vectors(collection_name, batch_size):
+                point_ids = list(chunk)
+                reduced = project(projection, [chunk[point_id] for point_id in point_ids])
+                qdrant.write_reduced_vectors(collection_name, dict(zip(point_ids, reduced.tolist())))
+                written += len(point_ids)
+            logger.info(f"Backfilled {written} reduced vectors in {collection_name}.")
+
+        if publish_projection(version):
+            logger.info(f"Published projection v{version}.")
+        else:
+            logger.warning(f"Projection v{version} was replaced by a newer refit, not published.")
+
+    except Exception as e:
+        logger.exception(f"Error in refit_reduced_vectors: {e}")
@@ -0,0 +1,69 @@
+# app/tasks/sync_recipe_payloads.py
+
+from app.celery_app import celery_app
+from app.core.dependencies import get_qdrant_service
+from app.core.database import SessionLocal
+from app.models.models import Recipe
+from app.services.qdrant_service import BaseQdrantService
+import logging
+
+logger = logging.getLogger(__name__)
+
+@celery_app.task
+def sync_recipe_payloads(batch_size: int = 256, only_missing: bool = True):
+    """
+    Celery task to fill in the lowercased CategoryLower / LabelLower payload
+    fields of recipe points that lack them. Category and label filters only
+    match points carrying them, so beat runs it for newly ingested recipes;
+    only_missing=False rewrites them for every recipe (idempotent).
+    """
+    try:
+        updated = get_qdrant_service().sync_normalized_payloads(batch_size, only_missing)
+        logger.info(f"Synced normalized payload fields of {updated} recipes.")
+    except Exception as e:
+        logger.exception(f"Error in sync_recipe_payloads: {e}")
+
+@celery_app.task
+def sync_recipe_numeric_payloads(batch_size: int = 500, only_missing: bool = False):
+    """
+    Celery task to copy the numeric Recipe columns (total_time, calories, fat,
+    protein, carb) from Postgres into the recipe payloads, where they are range
+    indexed for sorting and filtering. Range filters skip points without them,
+    so beat runs it with only_missing=True for newly ingested recipes, and in
+    full nightly to pick up recipe edits. Idempotent.
+    """
+    qdrant = get_qdrant_service()
+    columns = list(BaseQdrantService.NUMERIC_PAYLOAD_FIELDS)
+    db = None
+    try:
+        db = SessionLocal()
+        updated = 0
+        if only_missing:
+            # Points without a recipe row get empty fields too, so they are not scanned again
+            payload_key = BaseQdrantService.NUMERIC_PAYLOAD_FIELDS[columns[0]][0]
+            for recipe_ids in qdrant.iter_recipe_ids_missing_payload(payload_key, batch_size):
+                batch = {recipe_id: {} for recipe_id in recipe_ids}
+                rows = db.query(Recipe.recipe_id, *(getattr(Recipe, column) for column in columns))\
+                    .filter(Recipe.recipe_id.in_(recipe_ids))
+                for row in rows:
+                    batch[row.recipe_id] = {column: getattr(row, column) for column in columns}
+                updated += qdrant.set_recipe_numeric_payloads(batch)
+        else:
+            query = (
+                db.query(Recipe.recipe_id, *(getattr(Recipe, column) for column in columns))
+                .order_by(Recipe.recipe_id)
+                .yield_per(batch_size)
+            )
+            batch = {}
+            for row in query:
+                batch[row.recipe_id] = {column: getattr(row, column) for column in columns}
+                if len(batch) >= batch_size:
+                    updated += qdrant.set_recipe_numeric_payloads(batch)
+                    batch = {}
+            updated += qdrant.set_recipe_numeric_payloads(batch)
+        logger.info(f"Synced numeric payload fields of {updated} recipes.")
+    except Exception as e:
+        logger.exception(f"Error in sync_recipe_numeric_payloads: {e}")
+    finally:
+        if db is not None:
+            db.close()
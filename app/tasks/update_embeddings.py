@@ -1,57 +1,93 @@
 # app/tasks/update_embeddings.py
 
 from app.celery_app import celery_app
-from app.services.qdrant_service import QdrantService
+from app.core.dependencies import get_qdrant_service
 from app.core.database import SessionLocal
 from sqlalchemy import text
-from app.core.config import Settings
 from app.services import recipe_service
-from app.utils.embedding_tracker import get_users_to_update, clear_user_from_update
+from app.utils.embedding_tracker import get_users_to_update, mark_user_for_update, pop_user_interactions
 import logging
 
 logger = logging.getLogger(__name__)
 
-settings = Settings()
-qdrant = QdrantService(settings)
-
 @celery_app.task
 def update_recent_users_embeddings():
     """
-    Celery task to update embeddings for users who updated likes/dislikes in the last 3 minutes.
+    Celery task to update the embeddings of users queued in users_to_update
+    (likes/dislikes through the API, or mark_user_for_update). Queued interaction
+    events are applied incrementally; users without usable events are rebuilt
+    from their full history. A user that fails is queued again for the next run.
     """
     db = None
     try:
         db = SessionLocal()
+        user_ids = [str(user_id) for user_id in get_users_to_update()]
+        logger.info(f"Found {len(user_ids)} users with recent changes.")
 
-        # Query recently changed users (user_id is string)
-        sql = text("""
-            SELECT DISTINCT user_id FROM (
-                SELECT user_id FROM liked_recipes WHERE updated_at >= NOW() - INTERVAL '3 minutes'
-                UNION
-                SELECT user_id FROM disliked_recipes WHERE updated_at >= NOW() - INTERVAL '3 minutes'
-            ) AS recent_users
-        """)
+        qdrant = get_qdrant_service()
+        for user_id in user_ids:
+            # Also removes the user from users_to_update, atomically with the events
+            events = pop_user_interactions(user_id)
+            try:
+                result = qdrant.apply_user_interactions(user_id, events) if events else None
+            except Exception as e:
+                logger.warning(f"Incremental embedding update failed for user {user_id}: {e}")
+                result = None
 
-        result = db.execute(sql)
-        # Keep user_ids as strings, as they are in the DB
-        recent_user_ids = [row[0] for row in result.fetchall()]
-        redis_user_ids = get_users_to_update()
-        user_ids = list(set(recent_user_ids + redis_user_ids))
+            if result is not None:
+                logger.info(f"Applied {len(events)} interactions to embedding of user {user_id}")
+                continue
+            try:
+                # No queued events (changes made outside the API) or no usable running state
+                _rebuild_user_embedding(db, user_id)
+            except Exception as e:
+                logger.exception(f"Rebuilding embedding of user {user_id} failed, retrying next run: {e}")
+                mark_user_for_update(user_id)
 
-        logger.info(f"Found {len(user_ids)} users with recent changes.")
+    except Exception as e:
+        logger.exception(f"Error in update_recent_users_embeddings: {e}")
+    finally:
+        if db is not None:
+            db.close()
 
-        for user_id in user_ids:
-            # Get liked and disliked recipe IDs from your service
-            liked_recipes = recipe_service.get_user_liked_recipes_ids(db, user_id)
-            disliked_recipes = recipe_service.get_user_disliked_recipes_ids(db, user_id)
 
-            # Delete old embedding first to ensure freshness
-            qdrant.delete_user_embedding(user_id)
+@celery_app.task
+def rebuild_user_embeddings(user_ids: list[str] = None):
+    """
+    Consistency repair: recomputes embeddings (and running sums) from the full
+    like/dislike history. Without user_ids every user with interactions is rebuilt.
+    """
+    db = None
+    try:
+        db = SessionLocal()
+        if user_ids is None:
+            sql = text("""
+                SELECT user_id FROM liked_recipes
+                UNION
+                SELECT user_id FROM disliked_recipes
+            """)
+            user_ids = [row[0] for row in db.execute(sql).fetchall()]
 
-            # Recalculate and insert the new embedding
-            qdrant.upsert_user(user_id=user_id, liked=liked_recipes, disliked=disliked_recipes)
-            clear_user_from_update(user_id)
-            logger.info(f"Updated embedding for user {user_id}")
+        logger.info(f"Rebuilding embeddings of {len(user_ids)} users.")
+        for user_id in user_ids:
+            _rebuild_user_embedding(db, user_id)
 
     except Exception as e:
-        logger.exception(f"Error in update_recent_users_embeddings: {e}")
\ No newline at end of file
+        logger.exception(f"Error in rebuild_user_embeddings: {e}")
+    finally:
+        if db is not None:
+            db.close()
+
+
+def _rebuild_user_embedding(db, user_id: str):
+    qdrant = get_qdrant_service()
+    # Get liked and disliked recipe IDs from your service
+    liked_recipes = recipe_service.get_user_liked_recipes_ids(db, user_id)
+    disliked_recipes = recipe_service.get_user_disliked_recipes_ids(db, user_id)
+
+    # Delete old embedding first to ensure freshness
+    qdrant.delete_user_embedding(user_id)
+
+    # Recalculate and insert the new embedding
+    qdrant.upsert_user(user_id=user_id, liked=liked_recipes, disliked=disliked_recipes)
+    logger.info(f"Updated embedding for user {user_id}")
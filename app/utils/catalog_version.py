@@ -0,0 +1,31 @@
+# app/utils/catalog_version.py
+
+import logging
+from typing import Optional
+
+from app.utils.redis_client import redis_client
+
+logger = logging.getLogger(__name__)
+
+# Catalog-wide generation counter. Every write of recipe payloads bumps it, and
+# caches derived from the catalog (search results, the full-text index) key
+# their entries by the generation they were computed for, so nothing computed
+# before an update is served after it, in any process.
+
+CATALOG_VERSION_KEY = "catalog_version"
+
+def get_catalog_version() -> Optional[int]:
+    """Current catalog generation, or None when Redis is unavailable (callers should not cache then)."""
+    try:
+        return int(redis_client.get(CATALOG_VERSION_KEY) or 0)
+    except Exception as e:
+        logger.error(f"Error reading catalog version: {e}")
+        return None
+
+def bump_catalog_version() -> Optional[int]:
+    """Marks the catalog as changed; returns the new generation (None if Redis is unavailable)."""
+    try:
+        return int(redis_client.incr(CATALOG_VERSION_KEY))
+    except Exception as e:
+        logger.error(f"Error bumping catalog version: {e}")
+        return None
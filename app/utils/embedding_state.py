@@ -0,0 +1,42 @@
+# app/utils/embedding_state.py
+
+from typing import Optional
+import numpy as np
+
+from app.utils.redis_client import redis_client
+
+# Running sums and counts of the liked/disliked recipe vectors of a user.
+# The user embedding is liked_sum / liked_count - disliked_sum / disliked_count,
+# so a single interaction only needs one vector addition or subtraction.
+
+def _state_key(user_id) -> str:
+    return f"user_embedding_state:{user_id}"
+
+def get_user_embedding_state(user_id, vector_size: int) -> Optional[dict]:
+    """Returns the stored state, or None if it is missing or has a different vector size."""
+    raw = redis_client.hgetall(_state_key(user_id))
+    if not raw:
+        return None
+    try:
+        state = {
+            "liked_sum": np.frombuffer(raw[b"liked_sum"], dtype=np.float64).copy(),
+            "liked_count": int(raw[b"liked_count"]),
+            "disliked_sum": np.frombuffer(raw[b"disliked_sum"], dtype=np.float64).copy(),
+            "disliked_count": int(raw[b"disliked_count"]),
+        }
+    except (KeyError, ValueError):
+        return None
+    if state["liked_sum"].shape != (vector_size,) or state["disliked_sum"].shape != (vector_size,):
+        return None
+    return state
+
+def save_user_embedding_state(user_id, state: dict):
+    redis_client.hset(_state_key(user_id), mapping={
+        "liked_sum": np.asarray(state["liked_sum"], dtype=np.float64).tobytes(),
+        "liked_count": int(state["liked_count"]),
+        "disliked_sum": np.asarray(state["disliked_sum"], dtype=np.float64).tobytes(),
+        "disliked_count": int(state["disliked_count"]),
+    })
+
+def delete_user_embedding_state(user_id):
+    redis_client.delete(_state_key(user_id))
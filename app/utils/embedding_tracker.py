@@ -1,15 +1,52 @@
 # app/utils/embedding_tracker.py
 
-import redis
+import json
 
-redis_client = redis.Redis(host="redis", port=6379, db=0)
+from app.utils.redis_client import redis_client
+from app.utils.recommendation_cache import invalidate_user_recommendations
 
 def mark_user_for_update(user_id: int):
-    redis_client.sadd("users_to_update", user_id)
+    """
+    Queues a full rebuild of the user embedding from the like/dislike history.
+    Queued interaction events are dropped, the rebuild covers them.
+    """
+    pipe = redis_client.pipeline()
+    pipe.delete(f"user_interactions:{user_id}")
+    pipe.sadd("users_to_update", user_id)
+    invalidate_user_recommendations(user_id, pipe)
+    pipe.execute()
 
 def get_users_to_update() -> list[int]:
     users = redis_client.smembers("users_to_update")
     return [int(uid) for uid in users]
 
-def clear_user_from_update(user_id: int):
-    redis_client.srem("users_to_update", user_id)
+# Interaction events let the embedding job update a user incrementally
+# instead of re-reading the whole like/dislike history.
+def record_user_interactions(user_id: int, interactions: list[tuple]):
+    """
+    Queues like/dislike changes of one user in a single transaction, as
+    (recipe_id, kind, added) tuples; kind is "liked" or "disliked".
+    """
+    events = [
+        json.dumps({"recipe_id": int(recipe_id), "kind": kind, "added": added})
+        for recipe_id, kind, added in interactions
+    ]
+    pipe = redis_client.pipeline()
+    pipe.rpush(f"user_interactions:{user_id}", *events)
+    pipe.sadd("users_to_update", user_id)
+    invalidate_user_recommendations(user_id, pipe)
+    pipe.execute()
+
+def pop_user_interactions(user_id: int) -> list[dict]:
+    """
+    Atomically returns and removes the queued interaction events of a user, oldest
+    first, and takes the user off users_to_update in the same transaction. An event
+    recorded afterwards re-adds the user, so it is picked up by the next run.
+    """
+    key = f"user_interactions:{user_id}"
+    pipe = redis_client.pipeline()
+    pipe.lrange(key, 0, -1)
+    pipe.delete(key)
+    pipe.srem("users_to_update", user_id)
+    events, _, _ = pipe.execute()
+    return [json.loads(event) for event in events]
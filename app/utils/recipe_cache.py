@@ -0,0 +1,178 @@
+# app/utils/recipe_cache.py
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Hashable, Iterable, Optional
+
+from app.utils.redis_client import redis_client
+
+logger = logging.getLogger(__name__)
+
+# Bookkeeping cost charged per entry on top of the serialized bytes
+# (bytes object header, OrderedDict node and key object), rounded up.
+ENTRY_OVERHEAD_BYTES = 128
+
+# Recipe rows edited directly in Postgres do not bump the catalog version, so the
+# TTL is the staleness bound of the cache; it is capped to keep that bound short.
+MAX_TTL_SECONDS = 60 * 60
+
+
+# Shape of the serialized recipe documents. Bump it whenever the RecipeSchema
+# JSON changes: cached details (Redis keys) and recipe_document rows of another
+# format are then ignored until they are rebuilt, without waiting for a refresh.
+# 2: ingredients carry the recipe's own quantity and unit.
+DOCUMENT_FORMAT = 2
+
+
+def _redis_key(version: int, recipe_id: Hashable) -> str:
+    return f"recipe_detail:v{DOCUMENT_FORMAT}:{version}:{recipe_id}"
+
+
+class RecipeDetailCache:
+    """
+    Read-through cache of serialized recipe details (RecipeSchema JSON) with two
+    tiers: a thread-safe in-process LRU with a hard memory budget, and an optional
+    Redis tier shared by all processes.
+
+    Entries belong to a catalog generation (app.utils.catalog_version). The
+    in-process tier is dropped as soon as a newer generation is seen; Redis entries
+    of older generations are simply never read again. Entries of both tiers expire
+    after `ttl_seconds` (at most MAX_TTL_SECONDS), so changes that do not bump the
+    generation are served after at most twice the TTL (Redis, then in-process).
+    `ttl_seconds` of 0 disables the cache, `max_bytes` of 0 the in-process tier and
+    `use_redis=False` the Redis tier.
+    """
+
+    def __init__(self, max_bytes: int, ttl_seconds: int, use_redis: bool = True, redis=redis_client):
+        self.max_bytes = max(0, int(max_bytes))
+        self.ttl_seconds = min(max(0, int(ttl_seconds)), MAX_TTL_SECONDS)
+        self.use_redis = use_redis
+        self._redis = redis
+        # recipe_id -> (expires_at, document)
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._version: Optional[int] = None
+        self.current_bytes = 0
+        self.local_hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0 and (self.max_bytes > 0 or self.use_redis)
+
+    @staticmethod
+    def _entry_size(entry: tuple) -> int:
+        return len(entry[1]) + ENTRY_OVERHEAD_BYTES
+
+    def _switch_version(self, version: int) -> bool:
+        """Drops the in-process tier when `version` is newer; False if `version` is older (lock held)."""
+        if self._version is not None and version < self._version:
+            return False
+        if version != self._version:
+            self._entries.clear()
+            self.current_bytes = 0
+            self._version = version
+        return True
+
+    def get_many(self, version: int, recipe_ids: Iterable[Hashable]) -> Dict[Hashable, bytes]:
+        """Returns the cached documents of `recipe_ids` for catalog generation `version`."""
+        recipe_ids = list(recipe_ids)
+        if not self.enabled or not recipe_ids:
+            return {}
+
+        found: Dict[Hashable, bytes] = {}
+        now = time.monotonic()
+        with self._lock:
+            if self._switch_version(version):
+                for recipe_id in recipe_ids:
+                    entry = self._entries.get(recipe_id)
+                    if entry is None:
+                        continue
+                    if entry[0] <= now:
+                        del self._entries[recipe_id]
+                        self.current_bytes -= self._entry_size(entry)
+                        continue
+                    self._entries.move_to_end(recipe_id)
+                    found[recipe_id] = entry[1]
+            self.local_hits += len(found)
+
+        remaining = [recipe_id for recipe_id in recipe_ids if recipe_id not in found]
+        if remaining and self.use_redis:
+            try:
+                values = self._redis.mget([_redis_key(version, recipe_id) for recipe_id in remaining])
+            except Exception as e:
+                logger.error(f"Error reading recipe detail cache: {e}")
+                values = [None] * len(remaining)
+            from_redis = {recipe_id: value for recipe_id, value in zip(remaining, values) if value is not None}
+            if from_redis:
+                self._put_local(version, from_redis)
+                found.update(from_redis)
+            with self._lock:
+                self.redis_hits += len(from_redis)
+
+        with self._lock:
+            self.misses += len(recipe_ids) - len(found)
+        return found
+
+    def put_many(self, version: int, documents: Dict[Hashable, bytes]) -> None:
+        """Stores freshly built documents of catalog generation `version` in both tiers."""
+        if not self.enabled or not documents:
+            return
+        self._put_local(version, documents)
+        if self.use_redis:
+            try:
+                pipe = self._redis.pipeline(transaction=False)
+                for recipe_id, document in documents.items():
+                    pipe.set(_redis_key(version, recipe_id), document, ex=self.ttl_seconds)
+                pipe.execute()
+            except Exception as e:
+                logger.error(f"Error writing recipe detail cache: {e}")
+
+    def _put_local(self, version: int, documents: Dict[Hashable, bytes]) -> None:
+        if self.max_bytes <= 0:
+            return
+        expires_at = time.monotonic() + self.ttl_seconds
+        with self._lock:
+            if not self._switch_version(version):
+                return
+            for recipe_id, document in documents.items():
+                entry = (expires_at, document)
+                size = self._entry_size(entry)
+                if size > self.max_bytes:
+                    continue
+                previous = self._entries.pop(recipe_id, None)
+                if previous is not None:
+                    self.current_bytes -= self._entry_size(previous)
+                while self._entries and self.current_bytes + size > self.max_bytes:
+                    _, evicted = self._entries.popitem(last=False)
+                    self.current_bytes -= self._entry_size(evicted)
+                    self.evictions += 1
+                self._entries[recipe_id] = entry
+                self.current_bytes += size
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            hits = self.local_hits + self.redis_hits
+            lookups = hits + self.misses
+            return {
+                "version": self._version,
+                "entries": len(self._entries),
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds,
+                "local_hits": self.local_hits,
+                "redis_hits": self.redis_hits,
+                "misses": self.misses,
+                "hit_ratio": hits / lookups if lookups else 0.0,
+                "local_hit_ratio": self.local_hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+            }
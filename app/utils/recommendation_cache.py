@@ -0,0 +1,109 @@
+# app/utils/recommendation_cache.py
+
+import hashlib
+import json
+import logging
+from typing import Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.utils.redis_client import redis_client
+
+logger = logging.getLogger(__name__)
+
+# Cached recommendation lists are keyed by a per-user generation counter.
+# Invalidation only bumps the counter, so every (limit, filters) variant of a
+# user becomes unreachable at once and the stale entries expire with their TTL.
+# The top-K lists precomputed offline (app.tasks.precompute_recommendations) are
+# sorted sets keyed by the same generation, so they go stale the same way.
+
+def _generation_key(user_id) -> str:
+    return f"recommendation_generation:{user_id}"
+
+def _filters_digest(filters: Optional[dict]) -> str:
+    if not filters:
+        return "none"
+    encoded = json.dumps(filters, sort_keys=True, default=str)
+    return hashlib.sha1(encoded.encode("utf-8")).hexdigest()[:16]
+
+def _cache_key(user_id, generation: int, limit: int, filters: Optional[dict]) -> str:
+    return f"recommendations:{user_id}:{generation}:{limit}:{_filters_digest(filters)}"
+
+def _precomputed_key(user_id, generation: int) -> str:
+    return f"precomputed_recommendations:{user_id}:{generation}"
+
+def recommendation_cache_key(user_id, limit: int, filters: Optional[dict] = None) -> Optional[str]:
+    """
+    Key of the current generation. Resolve it once before computing and reuse it
+    for the write, so a list computed across an invalidation is never served.
+    Returns None when the cache is disabled or Redis is unavailable.
+    """
+    if settings.RECOMMENDATION_CACHE_TTL_SECONDS <= 0:
+        return None
+    try:
+        generation = int(redis_client.get(_generation_key(user_id)) or 0)
+    except Exception as e:
+        logger.error(f"Error reading recommendation generation of user {user_id}: {e}")
+        return None
+    return _cache_key(user_id, generation, limit, filters)
+
+def get_cached_recommendations(key: Optional[str]) -> Optional[List[dict]]:
+    """Returns the cached recommendation list, or None on a miss."""
+    if key is None:
+        return None
+    try:
+        raw = redis_client.get(key)
+    except Exception as e:
+        logger.error(f"Error reading recommendation cache {key}: {e}")
+        return None
+    return json.loads(raw) if raw is not None else None
+
+def cache_recommendations(key: Optional[str], recommendations: List[dict]):
+    if key is None:
+        return
+    try:
+        redis_client.set(key, json.dumps(recommendations, default=str), ex=settings.RECOMMENDATION_CACHE_TTL_SECONDS)
+    except Exception as e:
+        logger.error(f"Error writing recommendation cache {key}: {e}")
+
+def invalidate_user_recommendations(user_id, pipe=None):
+    """Drops every cached recommendation list of the user; can be queued on an existing pipeline."""
+    (pipe or redis_client).incr(_generation_key(user_id))
+
+def get_recommendation_generations(user_ids: List[int]) -> Dict[int, int]:
+    """Current generations of many users in one round trip."""
+    if not user_ids:
+        return {}
+    values = redis_client.mget([_generation_key(user_id) for user_id in user_ids])
+    return {user_id: int(value or 0) for user_id, value in zip(user_ids, values)}
+
+def store_precomputed_recommendations(rankings: Dict[int, Tuple[int, List[Tuple[int, float]]]]):
+    """
+    Stores {user_id: (generation, [(recipe_id, score), ...])} as one sorted set per user.
+    The generation must be read before the ranking is computed.
+    """
+    pipe = redis_client.pipeline(transaction=False)
+    for user_id, (generation, ranking) in rankings.items():
+        key = _precomputed_key(user_id, generation)
+        pipe.delete(key)
+        if ranking:
+            pipe.zadd(key, {str(recipe_id): score for recipe_id, score in ranking})
+            pipe.expire(key, settings.PRECOMPUTED_RECOMMENDATIONS_TTL_SECONDS)
+    pipe.execute()
+
+def get_precomputed_recommendations(user_id, limit: int) -> Optional[List[int]]:
+    """
+    Returns the top `limit` precomputed recipe IDs of the user, best first, or None
+    if there is no fresh list or it was computed for fewer than `limit` recipes.
+    """
+    if limit > settings.PRECOMPUTED_RECOMMENDATIONS_TOP_K:
+        return None
+    try:
+        generation = int(redis_client.get(_generation_key(user_id)) or 0)
+        recipe_ids = redis_client.zrevrange(_precomputed_key(user_id, generation), 0, limit - 1)
+    except Exception as e:
+        logger.error(f"Error reading precomputed recommendations of user {user_id}: {e}")
+        return None
+    # A list shorter than limit cannot serve it, the live path may find more recipes
+    if len(recipe_ids) < limit:
+        return None
+    return [int(recipe_id) for recipe_id in recipe_ids]
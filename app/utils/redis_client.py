@@ -0,0 +1,6 @@
+# app/utils/redis_client.py
+
+import redis
+
+# Shared by the embedding tracker, embedding state and the caches built on Redis
+redis_client = redis.Redis(host="redis", port=6379, db=0)
@@ -0,0 +1,65 @@
+# app/utils/search_cursor.py
+
+import base64
+import hashlib
+import json
+import uuid
+from typing import Any, Callable, Optional, Tuple
+
+# Opaque paging cursors for search endpoints. A cursor carries the search phase,
+# the Qdrant scroll offset inside that phase and a digest of the query, so a
+# cursor replayed against a different query is rejected instead of paging garbage.
+# The digest is not a signature: callers validate the offset shape they expect.
+
+
+def query_digest(*parts: Any) -> str:
+    encoded = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha1(encoded.encode("utf-8")).hexdigest()[:12]
+
+
+def encode_cursor(phase: int, offset: Any, digest: str) -> str:
+    raw = json.dumps({"p": phase, "o": offset, "q": digest}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(
+    cursor: str, digest: str, is_valid: Optional[Callable[[int, Any], bool]] = None
+) -> Tuple[int, Any]:
+    """
+    Returns (phase, offset); raises ValueError for malformed or foreign cursors,
+    and for offsets rejected by `is_valid(phase, offset)`.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        phase, offset, cursor_digest = data["p"], data["o"], data["q"]
+    except (ValueError, TypeError, KeyError, IndexError, UnicodeError):
+        raise ValueError("Invalid cursor")
+    if not is_int(phase) or phase < 0 or not isinstance(cursor_digest, str):
+        raise ValueError("Invalid cursor")
+    if cursor_digest != digest:
+        raise ValueError("Cursor does not belong to this query")
+    if is_valid is not None and not is_valid(phase, offset):
+        raise ValueError("Invalid cursor")
+    return phase, offset
+
+
+def is_int(value: Any) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def is_number(value: Any) -> bool:
+    return is_int(value) or isinstance(value, float)
+
+
+def is_point_id(value: Any) -> bool:
+    """A Qdrant point id: unsigned integer or UUID string."""
+    if is_int(value):
+        return value >= 0
+    if not isinstance(value, str):
+        return False
+    try:
+        uuid.UUID(value)
+        return True
+    except ValueError:
+        return False
@@ -0,0 +1,61 @@
+# app/utils/search_sort.py
+
+import heapq
+from typing import Any, Callable, Dict, List, Optional
+
+# Sortable fields of /searchRecipe: API name -> (result key, key type).
+# Anything else is rejected by the RecipeSearch model.
+SORT_FIELDS: Dict[str, tuple] = {
+    "name": ("recipe_name", str),
+    "category": ("category", str),
+    "total_time": ("total_time", float),
+    "calories": ("calories", float),
+    "score": ("score", float),
+}
+
+# Sort fields Qdrant can order by server-side (range-indexed payload fields)
+ORDER_BY_PAYLOAD_FIELDS: Dict[str, str] = {
+    "total_time": "TotalTime",
+    "calories": "Calories",
+}
+
+
+def sort_key(field: str) -> Callable[[dict], Optional[Any]]:
+    """
+    Typed key of a result row for `field`: casefolded text or a float, and None
+    when the row has no usable value (wrong type, placeholder, missing).
+    """
+    result_key, key_type = SORT_FIELDS[field]
+
+    if key_type is str:
+        def text_key(row: dict) -> Optional[str]:
+            value = row.get(result_key)
+            return value.casefold() if isinstance(value, str) and value else None
+        return text_key
+
+    def number_key(row: dict) -> Optional[float]:
+        value = row.get(result_key)
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            return None
+        return float(value)
+    return number_key
+
+
+def top_k(rows: List[dict], field: str, descending: bool = False, k: Optional[int] = None) -> List[dict]:
+    """
+    First `k` rows ordered by `field` (all rows when k is None), with rows that
+    have no value last in either direction. Uses heap selection when only a
+    prefix is needed. Equal keys keep their input order.
+    """
+    key = sort_key(field)
+    keyed = [(key(row), row) for row in rows]
+    present = [item for item in keyed if item[0] is not None]
+    missing = [row for value, row in keyed if value is None]
+    k = len(rows) if k is None else max(0, k)
+
+    select = heapq.nlargest if descending else heapq.nsmallest
+    if k < len(present):
+        ordered = select(k, present, key=lambda item: item[0])
+    else:
+        ordered = sorted(present, key=lambda item: item[0], reverse=descending)
+    return ([row for _, row in ordered] + missing)[:k]
@@ -0,0 +1,181 @@
+# app/utils/text_index.py
+
+import heapq
+import math
+import re
+import threading
+import time
+import unicodedata
+from collections import Counter, defaultdict
+from typing import Dict, Hashable, Iterable, List, Optional, Tuple
+
+# BM25 parameters (the usual defaults)
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Term frequency multiplier per payload field; a word in the recipe name says
+# more about the recipe than the same word in its ingredient list.
+FIELD_WEIGHTS = {
+    "Name": 2.0,
+    "Category": 1.0,
+    "Label": 1.0,
+    "Ingredients": 1.0,
+}
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lowercases, strips accents (so "süt" and "sut", "İstanbul" and "istanbul"
+    match) and splits on non-word characters.
+    """
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    folded = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return _TOKEN_RE.findall(folded)
+
+
+def _field_texts(value) -> List[str]:
+    if isinstance(value, str):
+        return [value]
+    if isinstance(value, (list, tuple)):
+        return [v for v in value if isinstance(v, str)]
+    return []
+
+
+class RecipeTextIndex:
+    """
+    Thread-safe in-process inverted index over the recipe payloads with BM25
+    ranking. Documents are the FIELD_WEIGHTS fields of each point; a search is a
+    single pass over the postings of the query terms.
+
+    The index is rebuilt as a whole (see is_stale / replace); readers keep using
+    the previous snapshot while a rebuild is running. Rebuilds are driven by the
+    Qdrant services, which rebuild it when the catalog generation changes, or
+    after `ttl_seconds` when the generation cannot be read.
+    """
+
+    def __init__(self, ttl_seconds: int):
+        self.ttl_seconds = max(0, int(ttl_seconds))
+        self._lock = threading.Lock()
+        self._postings: Dict[str, Dict[Hashable, float]] = {}
+        self._doc_lengths: Dict[Hashable, float] = {}
+        self._payloads: Dict[Hashable, dict] = {}
+        self._avg_length = 0.0
+        self._built_at: Optional[float] = None
+        # Catalog generation the snapshot was built from (app.utils.catalog_version)
+        self.version: Optional[int] = None
+
+    def __len__(self) -> int:
+        return len(self._doc_lengths)
+
+    def is_stale(self, version: Optional[int] = None) -> bool:
+        """True when the snapshot is older than the TTL or than catalog generation `version`."""
+        built_at = self._built_at
+        if version is not None and version != self.version:
+            return True
+        return built_at is None or time.monotonic() - built_at >= self.ttl_seconds
+
+    def invalidate(self) -> None:
+        """Forces a rebuild on next use; the current snapshot stays readable until then."""
+        self._built_at = None
+
+    def replace(self, documents: Iterable[Tuple[Hashable, dict]], version: Optional[int] = None) -> None:
+        """Rebuilds the index from (point_id, payload) pairs of catalog generation `version`."""
+        postings: Dict[str, Dict[Hashable, float]] = defaultdict(dict)
+        doc_lengths: Dict[Hashable, float] = {}
+        payloads: Dict[Hashable, dict] = {}
+        for point_id, payload in documents:
+            payload = payload or {}
+            counts: Counter = Counter()
+            for field, weight in FIELD_WEIGHTS.items():
+                for text in _field_texts(payload.get(field)):
+                    for token in tokenize(text):
+                        counts[token] += weight
+            for token, tf in counts.items():
+                postings[token][point_id] = tf
+            doc_lengths[point_id] = sum(counts.values())
+            payloads[point_id] = payload
+
+        avg_length = sum(doc_lengths.values()) / len(doc_lengths) if doc_lengths else 0.0
+        with self._lock:
+            self._postings = dict(postings)
+            self._doc_lengths = doc_lengths
+            self._payloads = payloads
+            self._avg_length = avg_length
+            self._built_at = time.monotonic()
+            self.version = version
+
+    def matches(
+        self,
+        query: str,
+        categories: Optional[Iterable[str]] = None,
+        labels: Optional[Iterable[str]] = None,
+        ranges: Optional[Dict[str, Tuple[Optional[float], Optional[float]]]] = None,
+    ) -> Dict[Hashable, Tuple[float, dict]]:
+        """
+        BM25 score and payload of every point matching any query term.
+        categories (any) and labels (all) are compared with the lowercased
+        CategoryLower / LabelLower payload fields; ranges ({payload key: (min, max)},
+        inclusive) with numeric payload fields, which must be present.
+        """
+        terms = set(tokenize(query))
+        category_set = {c.strip().lower() for c in categories or [] if c.strip()}
+        label_set = {l.strip().lower() for l in labels or [] if l.strip()}
+
+        with self._lock:
+            postings, doc_lengths = self._postings, self._doc_lengths
+            payloads, avg_length = self._payloads, self._avg_length
+
+        n_docs = len(doc_lengths)
+        scores: Dict[Hashable, float] = defaultdict(float)
+        for term in terms:
+            term_postings = postings.get(term)
+            if not term_postings:
+                continue
+            df = len(term_postings)
+            idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+            for point_id, tf in term_postings.items():
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * doc_lengths[point_id] / avg_length)
+                scores[point_id] += idf * tf * (BM25_K1 + 1) / (tf + norm)
+
+        return {
+            point_id: (score, payloads[point_id])
+            for point_id, score in scores.items()
+            if self._matches(payloads[point_id], category_set, label_set, ranges or {})
+        }
+
+    def search(
+        self,
+        query: str,
+        limit: int,
+        offset: int = 0,
+        categories: Optional[Iterable[str]] = None,
+        labels: Optional[Iterable[str]] = None,
+        ranges: Optional[Dict[str, Tuple[Optional[float], Optional[float]]]] = None,
+    ) -> List[Tuple[Hashable, float, dict]]:
+        """
+        Returns (point_id, score, payload) of the best matches, best first,
+        skipping the first `offset` ones. Ties are broken by point id so paging
+        is stable.
+        """
+        top = heapq.nsmallest(
+            offset + limit,
+            self.matches(query, categories, labels, ranges).items(),
+            key=lambda item: (-item[1][0], str(item[0])),
+        )
+        return [(point_id, score, payload) for point_id, (score, payload) in top[offset:]]
+
+    @staticmethod
+    def _matches(payload: dict, categories: set, labels: set, ranges: dict) -> bool:
+        if categories and payload.get("CategoryLower") not in categories:
+            return False
+        if labels and not labels.issubset(payload.get("LabelLower") or []):
+            return False
+        for key, (low, high) in ranges.items():
+            value = payload.get(key)
+            if not isinstance(value, (int, float)):
+                return False
+            if (low is not None and value < low) or (high is not None and value > high):
+                return False
+        return True
@@ -0,0 +1,165 @@
+# app/utils/vector_cache.py
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Hashable, Iterable, Optional
+
+import numpy as np
+
+from app.utils.redis_client import redis_client
+
+logger = logging.getLogger(__name__)
+
+# Bookkeeping cost charged per entry on top of the vector bytes
+# (ndarray header, OrderedDict node and key object), rounded up.
+ENTRY_OVERHEAD_BYTES = 256
+
+# Redis generation of the recipe vectors, bumped when recipes are re-embedded
+RECIPE_VECTORS_VERSION_KEY = "recipe_vectors_version"
+
+# How often a cache re-reads its generation from Redis, i.e. how long other
+# processes may serve vectors replaced by a re-embedding
+VERSION_CHECK_SECONDS = 30
+
+
+class VectorCache:
+    """
+    Thread-safe LRU cache of float32 vectors with a hard memory budget.
+
+    Every entry is charged `vector.nbytes + ENTRY_OVERHEAD_BYTES`; least recently
+    used entries are evicted until the charged total fits in `max_bytes`.
+    A budget of 0 disables the cache.
+
+    With a `version_key`, the cache is tied to a generation counter in Redis:
+    bump_version() starts a new one, and every cache sharing the key drops its
+    entries when it next checks (at most every VERSION_CHECK_SECONDS).
+    """
+
+    def __init__(self, max_bytes: int, version_key: Optional[str] = None, redis=redis_client):
+        self.max_bytes = max(0, int(max_bytes))
+        self.version_key = version_key
+        self._redis = redis
+        self._version: Optional[int] = None
+        self._version_checked_at = float("-inf")
+        self._entries: "OrderedDict[Hashable, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _entry_size(vector: np.ndarray) -> int:
+        return vector.nbytes + ENTRY_OVERHEAD_BYTES
+
+    @property
+    def version_check_due(self) -> bool:
+        return self.version_key is not None and time.monotonic() - self._version_checked_at >= VERSION_CHECK_SECONDS
+
+    def check_version(self) -> None:
+        """Drops every entry if the generation in Redis changed; reads Redis only when a check is due."""
+        if not self.version_check_due:
+            return
+        self._version_checked_at = time.monotonic()
+        try:
+            version = int(self._redis.get(self.version_key) or 0)
+        except Exception as e:
+            # Keep serving the cached vectors, the next check retries
+            logger.error(f"Error reading vector cache version: {e}")
+            return
+        with self._lock:
+            if version != self._version:
+                self._entries.clear()
+                self.current_bytes = 0
+                self._version = version
+
+    def bump_version(self) -> Optional[int]:
+        """Clears this cache and starts a new generation; returns it (None without version_key or Redis)."""
+        self.clear()
+        if self.version_key is None:
+            return None
+        try:
+            version = int(self._redis.incr(self.version_key))
+        except Exception as e:
+            logger.error(f"Error bumping vector cache version: {e}")
+            return None
+        with self._lock:
+            self._version = version
+        return version
+
+    def get(self, key: Hashable) -> Optional[np.ndarray]:
+        self.check_version()
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return vector
+
+    def get_many(self, keys: Iterable[Hashable]) -> Dict[Hashable, np.ndarray]:
+        """Returns the cached subset of `keys`; absent keys count as misses."""
+        self.check_version()
+        found = {}
+        with self._lock:
+            for key in keys:
+                vector = self._entries.get(key)
+                if vector is None:
+                    self.misses += 1
+                    continue
+                self._entries.move_to_end(key)
+                self.hits += 1
+                found[key] = vector
+        return found
+
+    def put(self, key: Hashable, vector) -> None:
+        self.check_version()
+        vector = np.array(vector, dtype=np.float32)
+        vector.flags.writeable = False
+        size = self._entry_size(vector)
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.current_bytes -= self._entry_size(previous)
+            while self._entries and self.current_bytes + size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.current_bytes -= self._entry_size(evicted)
+                self.evictions += 1
+            self._entries[key] = vector
+            self.current_bytes += size
+
+    def invalidate(self, keys: Iterable[Hashable]) -> int:
+        """Drops the given keys and returns how many were cached."""
+        removed = 0
+        with self._lock:
+            for key in keys:
+                vector = self._entries.pop(key, None)
+                if vector is not None:
+                    self.current_bytes -= self._entry_size(vector)
+                    removed += 1
+        return removed
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "version": self._version,
+                "entries": len(self._entries),
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+            }
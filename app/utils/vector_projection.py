@@ -0,0 +1,140 @@
+# app/utils/vector_projection.py
+
+import logging
+import threading
+import time
+from typing import Optional
+
+import numpy as np
+from redis.exceptions import WatchError
+
+from app.utils.redis_client import redis_client
+
+logger = logging.getLogger(__name__)
+
+# PCA projection of the 4096-dim embeddings onto a few components, used for the
+# reduced named vector of two-stage search. It is fitted offline
+# (app.tasks.reduced_vectors) and shared through Redis; every process keeps a
+# copy and checks for a refit at most every PROJECTION_REFRESH_SECONDS.
+#
+# A refit first stages the new projection: writes already use it while queries
+# fall back to single-stage search, since the stored reduced vectors are being
+# rewritten with the new basis. Once they are backfilled it is published for queries.
+
+PROJECTION_KEY = "vector_projection"
+PENDING_PROJECTION_KEY = "vector_projection:pending"
+PROJECTION_VERSION_KEY = "vector_projection:version"
+PROJECTION_REFRESH_SECONDS = 60
+
+_lock = threading.Lock()
+_cached = {"active": None, "pending": None, "checked_at": 0.0}
+
+
+def fit_projection(vectors: np.ndarray, n_components: int) -> dict:
+    """Fits PCA on the rows of `vectors` and returns {"mean", "components"} as float32."""
+    vectors = np.asarray(vectors, dtype=np.float64)
+    n_components = min(n_components, vectors.shape[0], vectors.shape[1])
+    mean = vectors.mean(axis=0)
+    # Rows of vt are the principal axes, ordered by explained variance
+    _, _, vt = np.linalg.svd(vectors - mean, full_matrices=False)
+    return {
+        "mean": mean.astype(np.float32),
+        "components": vt[:n_components].astype(np.float32),
+    }
+
+
+def project(projection: dict, vectors) -> np.ndarray:
+    """Projects one vector (1-d) or many (2-d) onto the fitted components."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    return (vectors - projection["mean"]) @ projection["components"].T
+
+
+def stage_projection(projection: dict) -> int:
+    """
+    Stages a new projection for writes and retires the one used by queries.
+    Returns its version, to be passed to publish_projection after the backfill.
+    """
+    components = projection["components"]
+    version = int(redis_client.incr(PROJECTION_VERSION_KEY))
+    pipe = redis_client.pipeline()
+    pipe.delete(PENDING_PROJECTION_KEY)
+    pipe.hset(PENDING_PROJECTION_KEY, mapping={
+        "version": version,
+        "mean": projection["mean"].astype(np.float32).tobytes(),
+        "components": components.astype(np.float32).tobytes(),
+        "shape": f"{components.shape[0]},{components.shape[1]}",
+    })
+    pipe.delete(PROJECTION_KEY)
+    pipe.execute()
+    return version
+
+
+def publish_projection(version: int) -> bool:
+    """Makes the staged projection `version` the one used by queries; False if another refit replaced it."""
+    with redis_client.pipeline() as pipe:
+        try:
+            pipe.watch(PENDING_PROJECTION_KEY)
+            staged = pipe.hget(PENDING_PROJECTION_KEY, "version")
+            if staged is None or int(staged) != version:
+                pipe.unwatch()
+                return False
+            pipe.multi()
+            pipe.rename(PENDING_PROJECTION_KEY, PROJECTION_KEY)
+            pipe.execute()
+            return True
+        except WatchError:
+            return False
+
+
+def _read_projection(key: str) -> Optional[dict]:
+    raw = redis_client.hgetall(key)
+    if not raw or b"components" not in raw:
+        return None
+    n_components, dim = (int(x) for x in raw[b"shape"].decode().split(","))
+    return {
+        "version": int(raw[b"version"]),
+        "mean": np.frombuffer(raw[b"mean"], dtype=np.float32),
+        "components": np.frombuffer(raw[b"components"], dtype=np.float32).reshape(n_components, dim),
+    }
+
+
+def _refresh(name: str, key: str, version) -> None:
+    version = int(version) if version is not None else None
+    current = _cached[name]
+    if version == (current["version"] if current is not None else None):
+        return
+    # A published projection is the one staged before, no need to read it again
+    staged = _cached["pending"]
+    if version is not None and staged is not None and staged["version"] == version:
+        _cached[name] = staged
+    else:
+        _cached[name] = _read_projection(key) if version is not None else None
+
+
+def _load() -> dict:
+    now = time.monotonic()
+    with _lock:
+        if now - _cached["checked_at"] >= PROJECTION_REFRESH_SECONDS:
+            _cached["checked_at"] = now
+            try:
+                pipe = redis_client.pipeline(transaction=False)
+                pipe.hget(PROJECTION_KEY, "version")
+                pipe.hget(PENDING_PROJECTION_KEY, "version")
+                active_version, pending_version = pipe.execute()
+                _refresh("active", PROJECTION_KEY, active_version)
+                _refresh("pending", PENDING_PROJECTION_KEY, pending_version)
+            except Exception as e:
+                # Keep serving the last known projections
+                logger.error(f"Error loading vector projection: {e}")
+        return {"active": _cached["active"], "pending": _cached["pending"]}
+
+
+def load_projection() -> Optional[dict]:
+    """Returns the projection of queries, or None if none is published (or Redis is unavailable)."""
+    return _load()["active"]
+
+
+def load_write_projection() -> Optional[dict]:
+    """Returns the projection of written vectors: the staged one during a refit, else the published one."""
+    projections = _load()
+    return projections["pending"] or projections["active"]